@@ -2,6 +2,7 @@
 
 -- Create extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Create tables
 CREATE TABLE IF NOT EXISTS users (
@@ -16,8 +17,13 @@ CREATE TABLE IF NOT EXISTS users (
     phone_number VARCHAR(50),
     whatsapp_number VARCHAR(50),
     is_active BOOLEAN DEFAULT TRUE,
+    token_version INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    search_document TEXT GENERATED ALWAYS AS (
+        lower(coalesce(business_name, '') || ' ' || coalesce(first_name, '') || ' ' ||
+              coalesce(last_name, '') || ' ' || coalesce(email, ''))
+    ) STORED
 );
 
 CREATE TABLE IF NOT EXISTS categories (
@@ -38,7 +44,12 @@ CREATE TABLE IF NOT EXISTS products (
     base_price DECIMAL(10,2),
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(sku, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
 );
 
 CREATE TABLE IF NOT EXISTS inventory (
@@ -81,7 +92,8 @@ CREATE TABLE IF NOT EXISTS partnerships (
     status VARCHAR(50) DEFAULT 'pending',
     partnership_type VARCHAR(50) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_partnerships_requester_partner UNIQUE (requester_id, partner_id)
 );
 
 CREATE TABLE IF NOT EXISTS favorites (
@@ -89,7 +101,8 @@ CREATE TABLE IF NOT EXISTS favorites (
     user_id VARCHAR(36) REFERENCES users(id) NOT NULL,
     favorite_user_id VARCHAR(36) REFERENCES users(id) NOT NULL,
     favorite_type VARCHAR(50) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_favorites_user_favorite UNIQUE (user_id, favorite_user_id)
 );
 
 CREATE TABLE IF NOT EXISTS search_history (
@@ -98,23 +111,95 @@ CREATE TABLE IF NOT EXISTS search_history (
     search_term VARCHAR(255) NOT NULL,
     search_type VARCHAR(50) NOT NULL,
     result_count INTEGER NOT NULL,
+    search_count INTEGER NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id VARCHAR(36) PRIMARY KEY REFERENCES users(id),
+    total_products INTEGER NOT NULL DEFAULT 0,
+    active_partners INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_order_stats (
+    user_id VARCHAR(36) REFERENCES users(id) NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, status)
+);
+
+CREATE TABLE IF NOT EXISTS order_daily_rollup (
+    user_id VARCHAR(36) REFERENCES users(id) NOT NULL,
+    day DATE NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, status)
+);
+
+CREATE TABLE IF NOT EXISTS manufacturer_sales_weekly (
+    manufacturer_id VARCHAR(36) REFERENCES users(id) NOT NULL,
+    week DATE NOT NULL,
+    product_id VARCHAR(36) REFERENCES products(id) NOT NULL,
+    distributor_id VARCHAR(36) REFERENCES users(id) NOT NULL,
+    units BIGINT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    order_lines INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (manufacturer_id, week, product_id, distributor_id)
+);
+
+CREATE TABLE IF NOT EXISTS summary_refreshes (
+    name VARCHAR(100) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS trending_checkpoints (
+    worker VARCHAR(100) NOT NULL,
+    search_type VARCHAR(50) NOT NULL,
+    period VARCHAR(10) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    counters JSONB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (worker, search_type, period, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) REFERENCES users(id) NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+CREATE INDEX IF NOT EXISTS idx_users_search_document_trgm ON users USING gin(search_document gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_products_category ON products(category_id);
 CREATE INDEX IF NOT EXISTS idx_products_manufacturer ON products(manufacturer_id);
+CREATE INDEX IF NOT EXISTS idx_products_created_id ON products(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_products_base_price ON products(base_price);
+CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products USING gin(search_vector);
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING gin(name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_sku_trgm ON products USING gin(sku gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_inventory_distributor ON inventory(distributor_id);
 CREATE INDEX IF NOT EXISTS idx_inventory_product ON inventory(product_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_product_in_stock ON inventory(product_id, distributor_id)
+    INCLUDE (selling_price, quantity) WHERE is_available AND quantity > 0;
 CREATE INDEX IF NOT EXISTS idx_orders_retailer ON orders(retailer_id);
 CREATE INDEX IF NOT EXISTS idx_orders_distributor ON orders(distributor_id);
-CREATE INDEX IF NOT EXISTS idx_partnerships_requester ON partnerships(requester_id);
-CREATE INDEX IF NOT EXISTS idx_partnerships_partner ON partnerships(partner_id);
-CREATE INDEX IF NOT EXISTS idx_favorites_user ON favorites(user_id);
+CREATE INDEX IF NOT EXISTS idx_orders_retailer_created ON orders(retailer_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_distributor_created ON orders(distributor_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id);
+CREATE INDEX IF NOT EXISTS idx_partnerships_partner_requester ON partnerships(partner_id, requester_id);
 CREATE INDEX IF NOT EXISTS idx_favorites_favorite_user ON favorites(favorite_user_id);
-CREATE INDEX IF NOT EXISTS idx_search_history_user ON search_history(user_id);
+CREATE INDEX IF NOT EXISTS idx_search_history_user_created ON search_history(user_id, created_at DESC)
+    INCLUDE (id, search_term, search_type, result_count, search_count);
+CREATE INDEX IF NOT EXISTS idx_trending_checkpoints_lookup ON trending_checkpoints(search_type, period, bucket_start);
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens(expires_at);
 
 -- Insert sample data
 INSERT INTO categories (id, name, description) VALUES
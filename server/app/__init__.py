@@ -22,8 +22,19 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     jwt.init_app(app)
     
+    # Refuse rotated or signed-out refresh tokens, and tokens of deactivated
+    # users or issued before a role change
+    from app.utils.identity import is_token_revoked
+    from app.services import token_revocation
+    
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        if jwt_payload.get('type') == 'refresh' and token_revocation.is_revoked(jwt_payload['jti']):
+            return True
+        return is_token_revoked(jwt_payload)
+    
     # Setup CORS
-    CORS(app, origins=app.config['CORS_ORIGINS'])
+    CORS(app, origins=app.config['CORS_ORIGINS'], expose_headers=['X-Next-Cursor'])
     
     # Register blueprints
     from app.api.v1.auth import auth_bp
@@ -60,4 +71,7 @@ def create_app(config_class=Config):
     from app.cli import register_commands
     register_commands(app)
     
+    from app.benchmarks import register_benchmark_commands
+    register_benchmark_commands(app)
+    
     return app 
\ No newline at end of file
@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import User, Order, Product
-from app import db
+from datetime import datetime, timedelta
+from app.services import analytics
+from app.utils.decorators import role_required
+from app.utils.pagination import get_limit
+from app.utils.request_args import get_list_arg, get_datetime_arg
+from app.utils.identity import get_current_user
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -10,43 +14,79 @@ analytics_bp = Blueprint('analytics', __name__)
 def get_stats():
     """Get analytics stats for the current user"""
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        # Get basic stats based on user role
-        stats = {
-            'total_orders': 0,
-            'total_revenue': 0,
-            'pending_orders': 0,
-            'completed_orders': 0,
-            'total_products': 0,
-            'active_partners': 0
-        }
-        
-        if user.role == 'retailer':
-            # For retailers, get their orders
-            orders = Order.query.filter_by(retailer_id=current_user_id).all()
-            stats['total_orders'] = len(orders)
-            stats['total_revenue'] = sum(order.total_amount or 0 for order in orders)
-            stats['pending_orders'] = len([o for o in orders if o.status == 'pending'])
-            stats['completed_orders'] = len([o for o in orders if o.status == 'delivered'])
-            
-        elif user.role == 'distributor':
-            # For distributors, get orders they're fulfilling
-            orders = Order.query.filter_by(distributor_id=current_user_id).all()
-            stats['total_orders'] = len(orders)
-            stats['pending_orders'] = len([o for o in orders if o.status == 'pending'])
-            stats['completed_orders'] = len([o for o in orders if o.status == 'delivered'])
-            
-        elif user.role == 'manufacturer':
-            # For manufacturers, get their products
-            products = Product.query.filter_by(manufacturer_id=current_user_id).all()
-            stats['total_products'] = len(products)
-            
+        # Counters are maintained by the writes they count, so this is a primary key read
+        stats = analytics.get_user_stats(user)
+        
         return jsonify(stats), 200
         
     except Exception as e:
-        return jsonify({'message': 'Error fetching stats', 'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'message': 'Error fetching stats', 'error': str(e)}), 500
+
+@analytics_bp.route('/timeseries', methods=['GET'])
+@jwt_required()
+def get_timeseries():
+    """Order count and revenue per day, week or month for the current retailer or distributor"""
+    try:
+        user = get_current_user()
+        
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+        
+        if user.role not in ('retailer', 'distributor'):
+            return jsonify({'message': 'Time series are available to retailers and distributors'}), 403
+        
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in analytics.TIMESERIES_GRANULARITIES:
+            return jsonify({'message': f"granularity must be one of {', '.join(analytics.TIMESERIES_GRANULARITIES)}"}), 400
+        
+        try:
+            end = get_datetime_arg('to')
+            start = get_datetime_arg('from')
+            statuses = get_list_arg('status')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        end = end.date() if end else datetime.utcnow().date()
+        start = start.date() if start else end - timedelta(days=current_app.config['ANALYTICS_DEFAULT_RANGE_DAYS'])
+        
+        if start > end:
+            return jsonify({'message': 'from must not be after to'}), 400
+        if (end - start).days > current_app.config['ANALYTICS_MAX_RANGE_DAYS']:
+            return jsonify({'message': f"Range may span at most {current_app.config['ANALYTICS_MAX_RANGE_DAYS']} days"}), 400
+        
+        return jsonify({
+            'granularity': granularity,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'series': analytics.order_timeseries(user.id, granularity, start, end, statuses)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Error fetching time series', 'error': str(e)}), 500
+
+@analytics_bp.route('/manufacturer', methods=['GET'])
+@jwt_required()
+@role_required('manufacturer')
+def get_manufacturer_analytics():
+    """Top products, distributor breakdown and week-over-week change for the current manufacturer"""
+    try:
+        current_user_id = get_jwt_identity()
+        config = current_app.config
+        
+        weeks = request.args.get('weeks', config['MANUFACTURER_ANALYTICS_WEEKS'], type=int)
+        weeks = max(1, min(weeks, config['MANUFACTURER_ANALYTICS_MAX_WEEKS']))
+        limit = get_limit()
+        
+        refreshed_at = analytics.ensure_manufacturer_sales_fresh()
+        summary = analytics.manufacturer_sales_summary(current_user_id, weeks, limit)
+        summary['refreshedAt'] = refreshed_at.isoformat() if refreshed_at else None
+        
+        return jsonify(summary), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Error fetching manufacturer analytics', 'error': str(e)}), 500
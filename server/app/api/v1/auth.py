@@ -1,14 +1,30 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from datetime import datetime
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from app import db
 from app.models import User
 from app.utils.decorators import validate_json
 from app.utils.validators import UserSchema
+from app.utils.identity import token_claims, get_current_user
+from app.services import passwords, token_revocation
 from marshmallow import ValidationError
 import uuid
 
 auth_bp = Blueprint('auth', __name__)
 
+def issue_tokens(user):
+    """Access and refresh tokens carrying the user's current claims"""
+    claims = token_claims(user)
+    return {
+        'access_token': create_access_token(identity=str(user.id), additional_claims=claims),
+        'refresh_token': create_refresh_token(identity=str(user.id), additional_claims=claims)
+    }
+
+def hashing_busy_response():
+    response = jsonify({'message': 'Too many sign-ins in progress, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 @validate_json
 def register():
@@ -36,8 +52,11 @@ def register():
             is_active=True
         )
         
-        # Manually set the password
-        new_user.set_password(data['password'])
+        # Hashed on the bounded hashing pool, not the request thread
+        try:
+            new_user.password_hash = passwords.hash_password(data['password'])
+        except passwords.HashingBusy:
+            return hashing_busy_response()
         
         db.session.add(new_user)
         db.session.commit()
@@ -73,19 +92,30 @@ def login():
         if not user:
             return jsonify({'message': 'Invalid email or password'}), 401
         
-        # Check password
-        if not user.check_password(password):
-            return jsonify({'message': 'Invalid email or password'}), 401
-        
-        # Create access token
+        # Check password on the bounded hashing pool
         try:
-            access_token = create_access_token(identity=str(user.id))
+            if not passwords.verify_password(user.password_hash, password):
+                return jsonify({'message': 'Invalid email or password'}), 401
+        except passwords.HashingBusy:
+            return hashing_busy_response()
+        
+        # Upgrade hashes made with older parameters; skipped while the pool is busy
+        if passwords.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = passwords.hash_password(password)
+                db.session.commit()
+            except passwords.HashingBusy:
+                pass
+        
+        # Create access and refresh tokens
+        try:
+            tokens = issue_tokens(user)
         except Exception as e:
             return jsonify({'message': 'Token creation failed', 'error': str(e)}), 500
         
         return jsonify({
             'message': 'Login successful',
-            'access_token': access_token,
+            **tokens,
             'user': user.to_dict()
         }), 200
         
@@ -97,8 +127,7 @@ def login():
 def get_user():
     """Get current user information"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
@@ -109,16 +138,38 @@ def get_user():
         return jsonify({'message': 'Failed to get user', 'error': str(e)}), 500
 
 @auth_bp.route('/refresh', methods=['POST'])
-@jwt_required()
+@jwt_required(refresh=True)
 def refresh():
-    """Refresh JWT token"""
+    """Exchange a refresh token for a new access token and a new refresh token"""
     try:
-        current_user_id = get_jwt_identity()
-        new_token = create_access_token(identity=current_user_id)
+        claims = get_jwt()
         
-        return jsonify({
-            'access_token': new_token
-        }), 200
+        # Rotation: the presented token is revoked by the same statement that checks it is unused
+        if not token_revocation.revoke(claims['jti'], get_jwt_identity(), datetime.utcfromtimestamp(claims['exp'])):
+            db.session.rollback()
+            return jsonify({'message': 'Refresh token has already been used'}), 401
+        
+        # Claims come from the user as of now, so a new role shows up on refresh
+        tokens = issue_tokens(get_current_user())
+        db.session.commit()
+        
+        return jsonify(tokens), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Token refresh failed', 'error': str(e)}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    """Revoke the presented refresh token"""
+    try:
+        claims = get_jwt()
+        token_revocation.revoke(claims['jti'], get_jwt_identity(), datetime.utcfromtimestamp(claims['exp']))
+        db.session.commit()
+        
+        return jsonify({'message': 'Logged out'}), 200
         
     except Exception as e:
-        return jsonify({'message': 'Token refresh failed', 'error': str(e)}), 500 
\ No newline at end of file
+        db.session.rollback()
+        return jsonify({'message': 'Logout failed', 'error': str(e)}), 500 
\ No newline at end of file
@@ -1,20 +1,32 @@
-from flask import Blueprint, request, jsonify
+import uuid
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Favorite, User
 from app.utils.decorators import validate_json
+from app.utils.pagination import get_page_args, paginate_keyset, paginated_response
+from app.utils.inserts import insert_user_link
+from app.services import favorites
 
 favorites_bp = Blueprint('favorites', __name__)
 
 @favorites_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_favorites():
-    """Get user favorites"""
+    """Get user favorites, newest first, one page at a time"""
     try:
         current_user_id = get_jwt_identity()
         
-        favorites = Favorite.query.filter_by(user_id=current_user_id).all()
-        return jsonify([fav.to_dict() for fav in favorites]), 200
+        try:
+            limit, cursor = get_page_args()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        query = Favorite.query.filter_by(user_id=current_user_id).options(joinedload(Favorite.favorite_user))
+        favorite_rows, next_cursor = paginate_keyset(query, Favorite.created_at, Favorite.id, limit, cursor)
+        return paginated_response([fav.to_dict() for fav in favorite_rows], next_cursor), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch favorites', 'error': str(e)}), 500
@@ -34,30 +46,30 @@ def add_favorite():
         if not favorite_user_id or not favorite_type:
             return jsonify({'message': 'Favorite user ID and type are required'}), 400
         
-        # Check if already favorited
-        existing_fav = Favorite.query.filter_by(
-            user_id=current_user_id,
-            favorite_user_id=favorite_user_id
-        ).first()
-        
-        if existing_fav:
-            return jsonify({'message': 'Already in favorites'}), 400
-        
-        # Verify the favorite user exists
-        favorite_user = User.query.get(favorite_user_id)
-        if not favorite_user:
+        try:
+            favorite_user_id = uuid.UUID(str(favorite_user_id))
+        except ValueError:
             return jsonify({'message': 'User not found'}), 404
         
-        new_favorite = Favorite(
-            user_id=current_user_id,
-            favorite_user_id=favorite_user_id,
-            favorite_type=favorite_type
-        )
-        
-        db.session.add(new_favorite)
+        # One statement: checks the user exists, skips duplicates even under concurrent requests
+        inserted = insert_user_link(Favorite, {
+            'id': uuid.uuid4(),
+            'user_id': uuid.UUID(current_user_id),
+            'favorite_type': favorite_type,
+            'created_at': datetime.utcnow()
+        }, 'favorite_user_id', favorite_user_id, ['user_id', 'favorite_user_id'])
+        # Serialized before commit expires the returned row and user
+        favorite_dict = inserted[0].to_dict() if inserted else None
         db.session.commit()
         
-        return jsonify(new_favorite.to_dict()), 201
+        if not inserted:
+            if not db.session.get(User, favorite_user_id):
+                return jsonify({'message': 'User not found'}), 404
+            return jsonify({'message': 'Already in favorites'}), 400
+        
+        favorites.favorite_added(current_user_id, favorite_user_id)
+        
+        return jsonify(favorite_dict), 201
         
     except Exception as e:
         db.session.rollback()
@@ -80,6 +92,7 @@ def remove_favorite(favorite_user_id):
         
         db.session.delete(favorite)
         db.session.commit()
+        favorites.favorite_removed(current_user_id, favorite_user_id)
         
         return jsonify({'message': 'Removed from favorites'}), 200
         
@@ -94,12 +107,30 @@ def check_favorite(favorite_user_id):
     try:
         current_user_id = get_jwt_identity()
         
-        favorite = Favorite.query.filter_by(
-            user_id=current_user_id,
-            favorite_user_id=favorite_user_id
-        ).first()
+        ids = favorites.favorite_ids(current_user_id)
+        return jsonify({'isFavorite': favorites.is_favorite(ids, favorite_user_id)}), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to check favorite status', 'error': str(e)}), 500
+
+@favorites_bp.route('/check', methods=['POST'])
+@jwt_required()
+@validate_json
+def check_favorites():
+    """Check many partners at once; answers {userId: isFavorite}"""
+    try:
+        current_user_id = get_jwt_identity()
+        user_ids = request.get_json().get('userIds')
+        
+        if not isinstance(user_ids, list) or not user_ids:
+            return jsonify({'message': 'userIds must be a non-empty list'}), 400
+        
+        max_ids = current_app.config['MAX_ITEMS_PER_PAGE']
+        if len(user_ids) > max_ids:
+            return jsonify({'message': f'At most {max_ids} userIds can be checked at once'}), 400
         
-        return jsonify({'isFavorite': favorite is not None}), 200
+        ids = favorites.favorite_ids(current_user_id)
+        return jsonify({str(user_id): favorites.is_favorite(ids, user_id) for user_id in user_ids}), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to check favorite status', 'error': str(e)}), 500 
\ No newline at end of file
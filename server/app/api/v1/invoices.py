@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import User, Order, Invoice, WhatsAppNotification
 from app import db
 from app.utils.decorators import role_required
+from app.utils.identity import get_current_user
 from datetime import datetime
 import uuid
 import os
@@ -227,7 +228,7 @@ def download_invoice(invoice_id):
         
         # Check if user has access to this invoice
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if user.role == 'retailer' and invoice.order.retailer_id != current_user_id:
             return jsonify({'message': 'Access denied'}), 403
@@ -1,8 +1,8 @@
 from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import User
+from flask_jwt_extended import jwt_required
 from app import db
 from datetime import datetime, timedelta
+from app.utils.identity import get_current_user
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -11,8 +11,7 @@ notifications_bp = Blueprint('notifications', __name__)
 def get_notifications():
     """Get notifications for the current user"""
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
@@ -2,39 +2,69 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import User, Order, OrderItem, Product, WhatsAppNotification
 from app import db
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import uuid
 from app.utils.decorators import role_required, validate_json
+from app.utils.pagination import get_page_args, paginate_keyset, paginated_response
+from app.utils.request_args import get_list_arg, get_datetime_arg, get_datetime_end_arg
+from app.utils.identity import get_current_user
+from app.services import analytics
 
 orders_bp = Blueprint('orders', __name__)
 
+# Loads the items of a set of orders, and their products, in two queries
+ORDER_ITEMS_LOADER = selectinload(Order.items).selectinload(OrderItem.product)
+
 @orders_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_orders():
-    """Get orders for current user based on role"""
+    """Get orders for current user based on role, newest first, one page at a time"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
+        try:
+            limit, cursor = get_page_args()
+            statuses = get_list_arg('status')
+            created_from = get_datetime_arg('from')
+            created_before = get_datetime_end_arg('to')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
         if user.role == 'retailer':
             # Retailers see their own orders
-            orders = Order.query.filter_by(retailer_id=current_user_id).order_by(Order.created_at.desc()).all()
+            query = Order.query.filter_by(retailer_id=current_user_id)
         elif user.role == 'distributor':
             # Distributors see orders assigned to them
-            orders = Order.query.filter_by(distributor_id=current_user_id).order_by(Order.created_at.desc()).all()
+            query = Order.query.filter_by(distributor_id=current_user_id)
         elif user.role == 'manufacturer':
-            # Manufacturers see orders for their products
-            # This would require joining through products and order items
-            orders = Order.query.join(OrderItem).join(Product).filter(
-                Product.manufacturer_id == current_user_id
-            ).order_by(Order.created_at.desc()).all()
+            # Manufacturers see orders containing their products; EXISTS keeps
+            # one row per order however many of its lines match
+            query = Order.query.filter(
+                Order.items.any(OrderItem.product.has(Product.manufacturer_id == current_user_id))
+            )
         else:
             return jsonify({'message': 'Invalid user role'}), 400
         
-        return jsonify([order.to_dict() for order in orders]), 200
+        if statuses:
+            query = query.filter(Order.status.in_(statuses))
+        if created_from:
+            query = query.filter(Order.created_at >= created_from)
+        if created_before:
+            query = query.filter(Order.created_at < created_before)
+        
+        summary = request.args.get('summary', '').lower() in ('1', 'true')
+        if not summary:
+            query = query.options(ORDER_ITEMS_LOADER)
+        
+        orders, next_cursor = paginate_keyset(query, Order.created_at, Order.id, limit, cursor)
+        
+        return paginated_response([order.to_dict(include_items=not summary) for order in orders], next_cursor), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch orders', 'error': str(e)}), 500
@@ -45,7 +75,7 @@ def get_order(order_id):
     """Get specific order details"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         order = Order.query.get(order_id)
         if not order:
@@ -89,63 +119,70 @@ def create_order():
         # Generate order number
         order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
         
-        # Calculate total amount
-        total_amount = 0
-        order_items = []
-        
+        # Validate items and load every referenced product in one query
+        product_ids = set()
         for item_data in items:
-            product_id = item_data.get('productId')
             quantity = item_data.get('quantity', 0)
             unit_price = item_data.get('unitPrice', 0)
             
-            if not product_id or quantity <= 0 or unit_price <= 0:
+            if not item_data.get('productId') or quantity <= 0 or unit_price <= 0:
                 return jsonify({'message': 'Invalid item data'}), 400
             
-            # Verify product exists
-            product = Product.query.get(product_id)
-            if not product:
+            try:
+                product_ids.add(uuid.UUID(str(item_data['productId'])))
+            except ValueError:
+                return jsonify({'message': 'Invalid item data'}), 400
+        
+        products = {
+            product.id: product
+            for product in Product.query.filter(Product.id.in_(product_ids)).all()
+        }
+        
+        for item_data in items:
+            product_id = uuid.UUID(str(item_data['productId']))
+            if product_id not in products:
                 return jsonify({'message': f'Product {product_id} not found'}), 404
-            
-            total_price = quantity * unit_price
-            total_amount += total_price
-            
-            order_items.append({
-                'product_id': product_id,
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'total_price': total_price
-            })
         
         # Create order
         new_order = Order(
+            id=uuid.uuid4(),
             order_number=order_number,
             retailer_id=current_user_id,
             distributor_id=distributor_id,
             status='pending',
             delivery_mode=delivery_mode,
-            total_amount=total_amount,
             notes=notes
         )
         
+        # Calculate totals and build item rows
+        total_amount = 0
+        item_rows = []
+        for item_data in items:
+            quantity = item_data['quantity']
+            unit_price = item_data['unitPrice']
+            total_price = quantity * unit_price
+            total_amount += total_price
+            
+            item_rows.append({
+                'id': uuid.uuid4(),
+                'order_id': new_order.id,
+                'product_id': uuid.UUID(str(item_data['productId'])),
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total_price': total_price
+            })
+        
+        new_order.total_amount = total_amount
         db.session.add(new_order)
-        db.session.flush()  # Get the order ID
-        
-        # Create order items
-        for item_data in order_items:
-            order_item = OrderItem(
-                order_id=new_order.id,
-                product_id=item_data['product_id'],
-                quantity=item_data['quantity'],
-                unit_price=item_data['unit_price'],
-                total_price=item_data['total_price']
-            )
-            db.session.add(order_item)
+        db.session.flush()
         
-        db.session.commit()
+        # Insert all order items with one multi-row statement
+        db.session.execute(insert(OrderItem), item_rows)
+        analytics.record_order_created(new_order)
         
-        # Send WhatsApp alert to distributor
-        retailer = User.query.get(current_user_id)
-        message = f"🛒 New order from {retailer.firstName} {retailer.lastName}\n"
+        # WhatsApp alert to distributor, committed with the order
+        retailer = get_current_user()
+        message = f"🛒 New order from {retailer.first_name} {retailer.last_name}\n"
         message += f"Order: {order_number}\n"
         message += f"Amount: ₹{total_amount}\n"
         message += f"Items: {len(items)} products\n"
@@ -161,13 +198,18 @@ def create_order():
             sent_at=datetime.utcnow(),
             is_delivered=True
         )
-        
         db.session.add(notification)
+        
+        # Serialize before commit expires the loaded objects
+        order_dict = new_order.to_dict(items=[
+            OrderItem(**row).to_dict(product=products[row['product_id']]) for row in item_rows
+        ])
+        
         db.session.commit()
         
         print(f"📱 Order Alert to Distributor {distributor.email}: {message}")
         
-        return jsonify(new_order.to_dict()), 201
+        return jsonify(order_dict), 201
         
     except Exception as e:
         db.session.rollback()
@@ -187,12 +229,13 @@ def update_order_status(order_id):
         if not new_status:
             return jsonify({'message': 'Status is required'}), 400
         
-        order = Order.query.get(order_id)
+        # Lock the order so concurrent updates move its stats counters one at a time
+        order = Order.query.with_for_update().get(order_id)
         if not order:
             return jsonify({'message': 'Order not found'}), 404
         
         # Verify distributor owns this order
-        if order.distributor_id != current_user_id:
+        if str(order.distributor_id) != current_user_id:
             return jsonify({'message': 'Access denied'}), 403
         
         # Update status
@@ -203,6 +246,7 @@ def update_order_status(order_id):
             order.delivery_mode = delivery_mode
         
         order.updated_at = datetime.utcnow()
+        analytics.record_order_status_change(order, old_status)
         db.session.commit()
         
         # Send WhatsApp notification to retailer
@@ -324,7 +368,7 @@ def get_order_history(partner_id):
     """Get order history with a specific partner"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         partner = User.query.get(partner_id)
         
         if not partner:
@@ -338,34 +382,27 @@ def get_order_history(partner_id):
             orders = Order.query.filter_by(
                 distributor_id=current_user_id,
                 retailer_id=partner_id
-            ).order_by(Order.created_at.desc()).all()
+            ).options(ORDER_ITEMS_LOADER).order_by(Order.created_at.desc()).all()
             
         elif current_user.role == 'manufacturer' and partner.role == 'distributor':
             # Manufacturer viewing orders with a distributor
             orders = Order.query.filter_by(
                 distributor_id=partner_id
-            ).join(OrderItem).join(Product).filter(
-                Product.manufacturer_id == current_user_id
-            ).order_by(Order.created_at.desc()).all()
+            ).filter(
+                Order.items.any(OrderItem.product.has(Product.manufacturer_id == current_user_id))
+            ).options(ORDER_ITEMS_LOADER).order_by(Order.created_at.desc()).all()
             
         elif current_user.role == 'retailer' and partner.role == 'distributor':
             # Retailer viewing orders with a distributor
             orders = Order.query.filter_by(
                 retailer_id=current_user_id,
                 distributor_id=partner_id
-            ).order_by(Order.created_at.desc()).all()
+            ).options(ORDER_ITEMS_LOADER).order_by(Order.created_at.desc()).all()
             
         else:
             return jsonify({'message': 'Access denied'}), 403
         
-        # Convert to dict with items
-        order_data = []
-        for order in orders:
-            order_dict = order.to_dict()
-            order_dict['items'] = [item.to_dict() for item in order.items]
-            order_data.append(order_dict)
-        
-        return jsonify(order_data), 200
+        return jsonify([order.to_dict() for order in orders]), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch order history', 'error': str(e)}), 500 
\ No newline at end of file
@@ -1,43 +1,44 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
-from app.models import User
 from app.utils.decorators import role_required
-from sqlalchemy import or_
+from app.utils.pagination import get_offset_page_args, encode_offset_cursor, paginated_response
+from app.utils.cache import payload_response
+from app.utils.identity import get_current_user
+from app.services import partner_directory
 
 partners_bp = Blueprint('partners', __name__)
 
+def directory_response(roles, exclude_user_id=None, available_to=None):
+    """Ranked, paginated directory page for the search and cursor query parameters"""
+    try:
+        limit, offset = get_offset_page_args()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    term = request.args.get('search', '')
+    if not exclude_user_id and not available_to:
+        # The same for every viewer, so served from the shared page cache
+        payload = partner_directory.cached_directory(roles, term, limit, offset)
+        return payload_response(payload, current_app.config['PARTNER_DIRECTORY_CACHE_MAX_AGE'], private=True)
+    
+    users, has_more = partner_directory.search_directory(
+        roles, term, limit, offset, exclude_user_id, available_to
+    )
+    next_cursor = encode_offset_cursor(offset + limit) if has_more else None
+    return paginated_response([user.to_public_dict() for user in users], next_cursor), 200
+
 @partners_bp.route('/distributors', methods=['GET'])
 @jwt_required()
 def get_distributors():
-    """Get all distributors (for retailers and manufacturers)"""
+    """Get distributors (for retailers and manufacturers)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        search = request.args.get('search', '')
+        current_user = get_current_user()
         
         # Only retailers and manufacturers can see distributors
-        if current_user.role not in ['retailer', 'manufacturer']:
+        if not current_user or current_user.role not in ['retailer', 'manufacturer']:
             return jsonify([]), 200
         
-        query = User.query.filter_by(role='distributor', is_active=True)
-        
-        # If current user is a distributor, exclude themselves from the list
-        if current_user and current_user.role == 'distributor':
-            query = query.filter(User.id != current_user_id)
-        
-        if search:
-            query = query.filter(
-                or_(
-                    User.business_name.ilike(f'%{search}%'),
-                    User.email.ilike(f'%{search}%'),
-                    User.first_name.ilike(f'%{search}%'),
-                    User.last_name.ilike(f'%{search}%')
-                )
-            )
-        
-        distributors = query.all()
-        return jsonify([dist.to_public_dict() for dist in distributors]), 200
+        return directory_response(['distributor'])
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch distributors', 'error': str(e)}), 500
@@ -46,24 +47,9 @@ def get_distributors():
 @jwt_required()
 @role_required('distributor')
 def get_retailers():
-    """Get all retailers (distributors only)"""
+    """Get retailers (distributors only)"""
     try:
-        search = request.args.get('search', '')
-        
-        query = User.query.filter_by(role='retailer', is_active=True)
-        
-        if search:
-            query = query.filter(
-                or_(
-                    User.business_name.ilike(f'%{search}%'),
-                    User.email.ilike(f'%{search}%'),
-                    User.first_name.ilike(f'%{search}%'),
-                    User.last_name.ilike(f'%{search}%')
-                )
-            )
-        
-        retailers = query.all()
-        return jsonify([ret.to_public_dict() for ret in retailers]), 200
+        return directory_response(['retailer'])
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch retailers', 'error': str(e)}), 500
@@ -72,24 +58,9 @@ def get_retailers():
 @jwt_required()
 @role_required('distributor')
 def get_manufacturers():
-    """Get all manufacturers (distributors only)"""
+    """Get manufacturers (distributors only)"""
     try:
-        search = request.args.get('search', '')
-        
-        query = User.query.filter_by(role='manufacturer', is_active=True)
-        
-        if search:
-            query = query.filter(
-                or_(
-                    User.business_name.ilike(f'%{search}%'),
-                    User.email.ilike(f'%{search}%'),
-                    User.first_name.ilike(f'%{search}%'),
-                    User.last_name.ilike(f'%{search}%')
-                )
-            )
-        
-        manufacturers = query.all()
-        return jsonify([man.to_public_dict() for man in manufacturers]), 200
+        return directory_response(['manufacturer'])
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch manufacturers', 'error': str(e)}), 500
@@ -97,88 +68,62 @@ def get_manufacturers():
 @partners_bp.route('/available', methods=['GET'])
 @jwt_required()
 def get_available_partners():
-    """Get available partners for current user"""
+    """Get users the current user has no partnership with yet"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({'message': 'User not found'}), 404
         
-        # Determine allowed roles based on user role
-        allowed_roles = []
-        if current_user.role == 'retailer':
-            allowed_roles = ['distributor']
-        elif current_user.role == 'distributor':
-            allowed_roles = ['retailer', 'manufacturer']
-        elif current_user.role == 'manufacturer':
-            allowed_roles = ['distributor']
-        
-        # Get existing partnerships
-        from app.models import Partnership
-        existing_partnerships = Partnership.query.filter_by(requester_id=current_user_id).all()
-        existing_partner_ids = [str(p.partner_id) for p in existing_partnerships]
-        
-        # Get available partners
-        query = User.query.filter(
-            User.role.in_(allowed_roles),
-            User.is_active == True,
-            User.id != current_user_id
+        return directory_response(
+            partner_directory.PARTNER_ROLES.get(current_user.role, []),
+            exclude_user_id=current_user_id,
+            available_to=current_user_id
         )
         
-        if existing_partner_ids:
-            query = query.filter(~User.id.in_(existing_partner_ids))
-        
-        available_partners = query.all()
-        
-        return jsonify([partner.to_public_dict() for partner in available_partners]), 200
-        
     except Exception as e:
         return jsonify({'message': 'Failed to fetch available partners', 'error': str(e)}), 500
 
 @partners_bp.route('/search', methods=['GET'])
 @jwt_required()
 def search_partners():
-    """Search partners globally"""
+    """Search partners globally, or find the ones stocking or making a product with ?product="""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        product = request.args.get('product')
+        current_user = get_current_user()
+        product = request.args.get('product', '').strip()
         
         if not current_user:
             return jsonify({'message': 'User not found'}), 404
         
-        if product:
-            # Search partners by product (simplified implementation)
-            allowed_roles = []
-            if current_user.role == 'retailer':
-                allowed_roles = ['distributor']
-            elif current_user.role == 'distributor':
-                allowed_roles = ['manufacturer']
-            
-            partners = User.query.filter(
-                User.role.in_(allowed_roles),
-                User.is_active == True,
-                User.id != current_user_id
-            ).all()
-            
-            return jsonify([partner.to_public_dict() for partner in partners]), 200
-        else:
-            # Get all global partners
-            allowed_roles = []
-            if current_user.role == 'retailer':
-                allowed_roles = ['distributor']
-            elif current_user.role == 'distributor':
-                allowed_roles = ['retailer', 'manufacturer']
-            elif current_user.role == 'manufacturer':
-                allowed_roles = ['distributor']
-            
-            partners = User.query.filter(
-                User.role.in_(allowed_roles),
-                User.is_active == True
-            ).all()
-            
-            return jsonify([partner.to_public_dict() for partner in partners]), 200
+        roles = partner_directory.PARTNER_ROLES.get(current_user.role, [])
+        if not product:
+            # Partner roles never include the user's own, so this is the shared directory
+            return directory_response(roles)
+        
+        sort = request.args.get('sort', 'relevance')
+        if sort not in partner_directory.PRODUCT_PARTNER_SORTS:
+            return jsonify({'message': f'Invalid sort. Use one of: {", ".join(partner_directory.PRODUCT_PARTNER_SORTS)}'}), 400
+        
+        try:
+            limit, offset = get_offset_page_args()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        rows, has_more = partner_directory.search_product_partners(
+            roles, product, sort, limit, offset, exclude_user_id=current_user_id
+        )
+        partners = []
+        for partner, (_, matched_products, lowest_price, total_stock) in rows:
+            partner_dict = partner.to_public_dict()
+            partner_dict['matchedProducts'] = matched_products
+            partner_dict['lowestPrice'] = float(lowest_price) if lowest_price is not None else None
+            partner_dict['totalStock'] = int(total_stock) if total_stock is not None else None
+            partners.append(partner_dict)
+        
+        next_cursor = encode_offset_cursor(offset + limit) if has_more else None
+        return paginated_response(partners, next_cursor), 200
         
     except Exception as e:
-        return jsonify({'message': 'Failed to search partners', 'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'message': 'Failed to search partners', 'error': str(e)}), 500
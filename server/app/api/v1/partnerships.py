@@ -1,20 +1,78 @@
+import uuid
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import Partnership, User
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from app.utils.decorators import validate_json
+from app.utils.pagination import get_page_args, paginate_keyset, paginated_response
+from app.utils.request_args import get_list_arg
+from app.utils.inserts import insert_user_link
+from app.services import analytics
 
 partnerships_bp = Blueprint('partnerships', __name__)
 
+def partnership_page(query, *loaded):
+    """Newest-first page of a partnership query, filtered by the status query parameter.
+
+    The sides in loaded are joined into the same query instead of being
+    loaded one row at a time. Returns the page's partnerships and the next
+    cursor, or raises ValueError for bad query parameters.
+    """
+    limit, cursor = get_page_args()
+    statuses = get_list_arg('status')
+    if statuses:
+        query = query.filter(Partnership.status.in_(statuses))
+    query = query.options(*(joinedload(getattr(Partnership, side)) for side in loaded))
+    return paginate_keyset(query, Partnership.created_at, Partnership.id, limit, cursor)
+
 @partnerships_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_partnerships():
-    """Get user partnerships"""
+    """Get partnership requests sent by the current user, newest first, one page at a time"""
     try:
         current_user_id = get_jwt_identity()
         
-        partnerships = Partnership.query.filter_by(requester_id=current_user_id).all()
-        return jsonify([partnership.to_dict() for partnership in partnerships]), 200
+        try:
+            partnerships, next_cursor = partnership_page(
+                Partnership.query.filter_by(requester_id=current_user_id), 'partner'
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        return paginated_response([partnership.to_dict() for partnership in partnerships], next_cursor), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch partnerships', 'error': str(e)}), 500
+
+@partnerships_bp.route('/all', methods=['GET'])
+@jwt_required()
+def get_all_partnerships():
+    """Get partnerships sent and received by the current user, newest first, one page at a time"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # One query; each side of the OR is served by a partnerships index leading on that column
+        query = Partnership.query.filter(or_(
+            Partnership.requester_id == current_user_id,
+            Partnership.partner_id == current_user_id
+        ))
+        try:
+            partnerships, next_cursor = partnership_page(query, 'requester', 'partner')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        result = []
+        for partnership in partnerships:
+            # Embed the other side only
+            sent = str(partnership.requester_id) == current_user_id
+            partnership_dict = partnership.to_dict(embed=('partner',) if sent else ('requester',))
+            partnership_dict['direction'] = 'sent' if sent else 'received'
+            result.append(partnership_dict)
+        
+        return paginated_response(result, next_cursor), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch partnerships', 'error': str(e)}), 500
@@ -34,31 +92,31 @@ def send_partnership_request():
         if not partner_id or not partnership_type:
             return jsonify({'message': 'Partner ID and partnership type are required'}), 400
         
-        # Check if request already exists
-        existing_request = Partnership.query.filter_by(
-            requester_id=current_user_id,
-            partner_id=partner_id
-        ).first()
-        
-        if existing_request:
-            return jsonify({'message': 'Partnership request already exists'}), 400
-        
-        # Verify partner exists
-        partner = User.query.get(partner_id)
-        if not partner:
+        try:
+            partner_id = uuid.UUID(str(partner_id))
+        except ValueError:
             return jsonify({'message': 'Partner not found'}), 404
         
-        new_partnership = Partnership(
-            requester_id=current_user_id,
-            partner_id=partner_id,
-            partnership_type=partnership_type,
-            status='pending'
-        )
-        
-        db.session.add(new_partnership)
+        # One statement: checks the partner exists, skips duplicates even under concurrent requests
+        now = datetime.utcnow()
+        inserted = insert_user_link(Partnership, {
+            'id': uuid.uuid4(),
+            'requester_id': uuid.UUID(current_user_id),
+            'partnership_type': partnership_type,
+            'status': 'pending',
+            'created_at': now,
+            'updated_at': now
+        }, 'partner_id', partner_id, ['requester_id', 'partner_id'])
+        # Serialized before commit expires the returned row and partner
+        partnership_dict = inserted[0].to_dict() if inserted else None
         db.session.commit()
         
-        return jsonify(new_partnership.to_dict()), 201
+        if not inserted:
+            if not db.session.get(User, partner_id):
+                return jsonify({'message': 'Partner not found'}), 404
+            return jsonify({'message': 'Partnership request already exists'}), 400
+        
+        return jsonify(partnership_dict), 201
         
     except Exception as e:
         db.session.rollback()
@@ -78,7 +136,8 @@ def respond_to_partnership(partnership_id):
         if status not in ['approved', 'rejected']:
             return jsonify({'message': 'Invalid status'}), 400
         
-        partnership = Partnership.query.get(partnership_id)
+        # Lock the partnership so concurrent responses move the active_partners counters one at a time
+        partnership = Partnership.query.with_for_update().get(partnership_id)
         
         if not partnership:
             return jsonify({'message': 'Partnership request not found'}), 404
@@ -87,10 +146,12 @@ def respond_to_partnership(partnership_id):
         if str(partnership.partner_id) != current_user_id:
             return jsonify({'message': 'Unauthorized'}), 403
         
+        old_status = partnership.status
         partnership.status = status
+        analytics.record_partnership_status_change(partnership, old_status)
         db.session.commit()
         
-        return jsonify(partnership.to_dict()), 200
+        return jsonify(partnership.to_dict(embed=('requester',))), 200
         
     except Exception as e:
         db.session.rollback()
@@ -99,12 +160,21 @@ def respond_to_partnership(partnership_id):
 @partnerships_bp.route('/received', methods=['GET'])
 @jwt_required()
 def get_received_partnerships():
-    """Get received partnership requests"""
+    """Get partnership requests received by the current user, newest first, one page at a time"""
     try:
         current_user_id = get_jwt_identity()
         
-        partnerships = Partnership.query.filter_by(partner_id=current_user_id).all()
-        return jsonify([partnership.to_dict() for partnership in partnerships]), 200
+        try:
+            partnerships, next_cursor = partnership_page(
+                Partnership.query.filter_by(partner_id=current_user_id), 'requester'
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        # The partner is the current user; embed who sent the request
+        return paginated_response(
+            [partnership.to_dict(embed=('requester',)) for partnership in partnerships], next_cursor
+        ), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch received partnerships', 'error': str(e)}), 500 
\ No newline at end of file
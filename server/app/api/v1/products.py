@@ -1,15 +1,39 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Product, Category, Inventory, User
+from app.models import Product, Inventory, User
 from app.utils.decorators import roles_required
-from sqlalchemy import or_
+from app.utils.pagination import (
+    get_page_args, get_offset_page_args, encode_offset_cursor,
+    paginate_keyset, paginated_response, stream_ndjson
+)
+from app.utils.request_args import get_uuid_list_arg
+from app.utils.cache import payload_response
+from app.utils.identity import get_current_user
+from app.services import analytics, catalog_cache, product_import, product_search, suggest
+from sqlalchemy import func
 
 products_bp = Blueprint('products', __name__)
 
+# Sort orders for partner catalogs; id keeps offset pages stable on ties
+PRODUCT_SORTS = {
+    'newest': (Product.created_at.desc(), Product.id),
+    'price': (Product.base_price.asc().nullslast(), Product.id),
+    '-price': (Product.base_price.desc().nullslast(), Product.id)
+}
+
+INVENTORY_PRICE = func.coalesce(Inventory.selling_price, Product.base_price)
+INVENTORY_SORTS = {
+    'newest': (Inventory.created_at.desc(), Inventory.id),
+    'price': (INVENTORY_PRICE.asc().nullslast(), Inventory.id),
+    '-price': (INVENTORY_PRICE.desc().nullslast(), Inventory.id),
+    'quantity': (Inventory.quantity.asc(), Inventory.id),
+    '-quantity': (Inventory.quantity.desc(), Inventory.id)
+}
+
 @products_bp.route('/', methods=['GET'])
 def get_products():
-    """Get all products"""
+    """Get products, newest first, one page at a time (or streamed with ?stream=1)"""
     try:
         category_id = request.args.get('categoryId')
         
@@ -18,8 +42,17 @@ def get_products():
         if category_id:
             query = query.filter_by(category_id=category_id)
         
-        products = query.all()
-        return jsonify([prod.to_dict() for prod in products]), 200
+        if request.args.get('stream', type=int):
+            query = query.order_by(Product.created_at.desc(), Product.id.desc())
+            return stream_ndjson(query, Product.to_dict)
+        
+        try:
+            limit, cursor = get_page_args()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        products, next_cursor = paginate_keyset(query, Product.created_at, Product.id, limit, cursor)
+        return paginated_response([prod.to_dict() for prod in products], next_cursor), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch products', 'error': str(e)}), 500
@@ -70,21 +103,53 @@ def create_product():
         )
         
         db.session.add(new_product)
+        analytics.record_products_created(current_user_id)
         db.session.commit()
         
+        suggest.add_product(new_product)
+        
         return jsonify(new_product.to_dict()), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Failed to create product', 'error': str(e)}), 500
 
+@products_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@roles_required(['manufacturer', 'distributor'])
+def bulk_import_products():
+    """Import many products from a streamed CSV or NDJSON body"""
+    try:
+        current_user_id = get_jwt_identity()
+        fmt = product_import.IMPORT_FORMATS.get(request.mimetype)
+        
+        if not fmt:
+            return jsonify({'message': 'Content-Type must be text/csv or application/x-ndjson'}), 415
+        
+        records = product_import.read_records(product_import.text_stream(request.stream), fmt)
+        report = product_import.import_products(
+            records,
+            current_user_id,
+            upsert=bool(request.args.get('upsert', type=int)),
+            batch_size=current_app.config['BULK_IMPORT_BATCH_SIZE'],
+            max_errors=current_app.config['BULK_IMPORT_MAX_ERRORS']
+        )
+        
+        if report.inserted or report.updated:
+            suggest.mark_stale()
+        
+        return jsonify(report.to_dict()), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Failed to import products', 'error': str(e)}), 500
+
 @products_bp.route('/partner/<partner_id>', methods=['GET'])
 @jwt_required()
 def get_partner_products(partner_id):
     """Get products from a specific partner"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         partner = User.query.get(partner_id)
         
         if not partner:
@@ -106,73 +171,114 @@ def get_partner_products(partner_id):
         if not can_view:
             return jsonify({'message': 'Access denied'}), 403
         
+        try:
+            limit, offset = get_offset_page_args()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        sort = request.args.get('sort', 'newest')
+        
         # Get products from partner based on their role
         if partner.role == 'distributor':
-            # For distributors, get products from their inventory
-            inventory_items = Inventory.query.filter_by(
-                distributor_id=partner_id,
-                is_available=True
-            ).all()
+            # For distributors, get products from their inventory in one joined query
+            if sort not in INVENTORY_SORTS:
+                return jsonify({'message': f'Invalid sort. Use one of: {", ".join(INVENTORY_SORTS)}'}), 400
+            
+            rows = db.session.query(Product, Inventory)\
+                .join(Inventory, Inventory.product_id == Product.id)\
+                .filter(
+                    Inventory.distributor_id == partner.id,
+                    Inventory.is_available == True,
+                    Product.is_active == True
+                )\
+                .order_by(*INVENTORY_SORTS[sort])\
+                .offset(offset)\
+                .limit(limit + 1)\
+                .all()
             
             products = []
-            for item in inventory_items:
-                product = Product.query.get(item.product_id)
-                if product and product.is_active:
-                    product_dict = product.to_dict()
-                    # Add inventory information
-                    product_dict['inventoryId'] = str(item.id)
-                    product_dict['quantity'] = item.quantity
-                    product_dict['sellingPrice'] = float(item.selling_price) if item.selling_price else None
-                    products.append(product_dict)
+            for product, item in rows[:limit]:
+                product_dict = product.to_dict()
+                # Add inventory information
+                product_dict['inventoryId'] = str(item.id)
+                product_dict['quantity'] = item.quantity
+                product_dict['sellingPrice'] = float(item.selling_price) if item.selling_price else None
+                products.append(product_dict)
+            has_more = len(rows) > limit
         elif partner.role == 'retailer':
             # Retailers don't have products to sell - they only buy
-            products = []
+            products, has_more = [], False
         else:
             # For manufacturers, get products directly
-            products = Product.query.filter_by(
-                manufacturer_id=partner_id,
+            if sort not in PRODUCT_SORTS:
+                return jsonify({'message': f'Invalid sort. Use one of: {", ".join(PRODUCT_SORTS)}'}), 400
+            
+            rows = Product.query.filter_by(
+                manufacturer_id=partner.id,
                 is_active=True
-            ).all()
-            products = [prod.to_dict() for prod in products]
+            ).order_by(*PRODUCT_SORTS[sort]).offset(offset).limit(limit + 1).all()
+            products = [prod.to_dict() for prod in rows[:limit]]
+            has_more = len(rows) > limit
         
-        return jsonify(products), 200
+        next_cursor = encode_offset_cursor(offset + limit) if has_more else None
+        return paginated_response(products, next_cursor), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch partner products', 'error': str(e)}), 500
 
 @products_bp.route('/categories', methods=['GET'])
 def get_categories():
-    """Get all categories"""
+    """Get all categories (cached, revalidated with ETag)"""
     try:
-        categories = Category.query.all()
-        return jsonify([cat.to_dict() for cat in categories]), 200
+        payload = catalog_cache.categories_cache.get(
+            'all', catalog_cache.load_categories, current_app.config['CATEGORY_CACHE_TTL']
+        )
+        return payload_response(payload, current_app.config['CATEGORY_CACHE_MAX_AGE'])
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch categories', 'error': str(e)}), 500
 
 @products_bp.route('/search', methods=['GET'])
 def search_products():
-    """Search products"""
+    """Search products, best matches first, optionally with facet counts"""
     try:
         search_term = request.args.get('q', '')
-        category_id = request.args.get('categoryId')
         
-        query = Product.query.filter_by(is_active=True)
+        try:
+            limit, offset = get_offset_page_args()
+            filters = {
+                'category_ids': get_uuid_list_arg('categoryId'),
+                'manufacturer_ids': get_uuid_list_arg('manufacturerId'),
+                'min_price': request.args.get('minPrice', type=float),
+                'max_price': request.args.get('maxPrice', type=float)
+            }
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
-        if search_term:
-            query = query.filter(
-                or_(
-                    Product.name.ilike(f'%{search_term}%'),
-                    Product.description.ilike(f'%{search_term}%'),
-                    Product.sku.ilike(f'%{search_term}%')
-                )
-            )
+        products, has_more = product_search.search_products(search_term, filters, limit, offset)
+        next_cursor = encode_offset_cursor(offset + limit) if has_more else None
+        results = [prod.to_dict() for prod in products]
         
-        if category_id:
-            query = query.filter_by(category_id=category_id)
+        if request.args.get('facets', type=int):
+            return paginated_response({
+                'products': results,
+                'facets': product_search.facet_counts(search_term, filters)
+            }, next_cursor), 200
+        
+        return paginated_response(results, next_cursor), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to search products', 'error': str(e)}), 500
+
+@products_bp.route('/suggest', methods=['GET'])
+def suggest_products():
+    """Typeahead suggestions over product names, SKUs and categories"""
+    try:
+        prefix = request.args.get('q', '')
+        limit = request.args.get('limit', current_app.config['SUGGEST_TOP_K'], type=int)
+        limit = max(1, min(limit, current_app.config['SUGGEST_TOP_K']))
         
-        products = query.all()
-        return jsonify([prod.to_dict() for prod in products]), 200
+        return jsonify(suggest.suggest(prefix, limit)), 200
         
     except Exception as e:
-        return jsonify({'message': 'Failed to search products', 'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'message': 'Failed to fetch suggestions', 'error': str(e)}), 500
\ No newline at end of file
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from marshmallow import ValidationError, EXCLUDE
 from app import db
 from app.models import SearchHistory, User
 from app.utils.decorators import validate_json
+from app.utils.pagination import get_limit
+from app.utils.validators import SearchHistorySchema
+from app.services import search_history, trending
 
 search_bp = Blueprint('search', __name__)
 
@@ -18,8 +22,15 @@ def get_search_history():
             .order_by(SearchHistory.created_at.desc())\
             .limit(limit)\
             .all()
+        results = [item.to_dict() for item in history]
         
-        return jsonify([item.to_dict() for item in history]), 200
+        # Include searches still waiting in this process's write buffer
+        if search_history.is_buffered():
+            pending = [search_history.row_to_dict(row) for row in search_history.get_buffer().pending_for(current_user_id)]
+            if pending:
+                results = sorted(pending + results, key=lambda item: item['createdAt'], reverse=True)[:limit]
+        
+        return jsonify(results), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch search history', 'error': str(e)}), 500
@@ -31,17 +42,23 @@ def add_search_history():
     """Add search to history"""
     try:
         current_user_id = get_jwt_identity()
-        data = request.get_json()
         
-        search_term = data.get('searchTerm')
-        search_type = data.get('searchType')
+        # Validated before buffering: a row the database rejects would be lost after the 202
+        try:
+            data = SearchHistorySchema().load(request.get_json(), partial=('resultCount',), unknown=EXCLUDE)
+        except ValidationError as e:
+            return jsonify({'message': 'Validation error', 'errors': e.messages}), 400
+        
+        search_term = data['searchTerm']
+        search_type = data['searchType']
         result_count = data.get('resultCount', 0)
         
-        if not search_term or not search_type:
-            return jsonify({'message': 'Search term and type are required'}), 400
+        trending.record_search(search_type, search_term)
         
-        if search_type not in ['product', 'manufacturer', 'distributor']:
-            return jsonify({'message': 'Invalid search type'}), 400
+        if search_history.is_buffered():
+            # Acknowledge now; the row is written with the next batch
+            row = search_history.get_buffer().record(current_user_id, search_term, search_type, result_count)
+            return jsonify(search_history.row_to_dict(row)), 202
         
         new_search = SearchHistory(
             user_id=current_user_id,
@@ -57,4 +74,23 @@ def add_search_history():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'message': 'Failed to add search history', 'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'message': 'Failed to add search history', 'error': str(e)}), 500
+
+@search_bp.route('/trending', methods=['GET'])
+@jwt_required()
+def get_trending_searches():
+    """Most searched terms of a type in the last hour or day"""
+    try:
+        search_type = request.args.get('type', 'product')
+        window = request.args.get('window', 'day')
+        
+        if search_type not in trending.SEARCH_TYPES:
+            return jsonify({'message': 'Invalid search type'}), 400
+        
+        if window not in trending.WINDOWS:
+            return jsonify({'message': f"window must be one of {', '.join(trending.WINDOWS)}"}), 400
+        
+        return jsonify(trending.trending(search_type, window, get_limit())), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch trending searches', 'error': str(e)}), 500
@@ -0,0 +1,309 @@
+import click
+import time
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from app import db
+
+BENCH_SKU_PREFIX = 'BENCH-'
+BENCH_WORDS = ['Laptop', 'Chair', 'Headphones', 'Television', 'Shirt', 'Jeans', 'Table', 'Bookshelf']
+
+def percentiles(samples):
+    """p50/p95/p99 of a list of timings in milliseconds"""
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+def timed(fn, runs):
+    """Run fn the given number of times and return per-run timings in milliseconds"""
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all()
+    return samples
+
+def report(label, samples):
+    stats = percentiles(samples)
+    click.echo(f"{label:<28} p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms p99={stats['p99']:.2f}ms")
+
+def seed_bench_products(count):
+    """Bulk insert synthetic products server-side with generate_series"""
+    existing = db.session.execute(
+        text("SELECT count(*) FROM products WHERE sku LIKE :prefix"),
+        {'prefix': f'{BENCH_SKU_PREFIX}%'}
+    ).scalar()
+    if existing >= count:
+        return
+    click.echo(f'Seeding {count - existing} benchmark products...')
+    db.session.execute(text("""
+        INSERT INTO products (id, name, description, sku, base_price, is_active, created_at, updated_at)
+        SELECT gen_random_uuid(),
+               (:words)[1 + i % :word_count] || ' Model ' || i,
+               'Synthetic ' || lower((:words)[1 + (i / 7) % :word_count]) || ' for benchmarking',
+               :prefix || lpad(i::text, 8, '0'),
+               (i % 1000) + 0.99,
+               true,
+               now() - (i || ' seconds')::interval,
+               now()
+        FROM generate_series(:start, :stop) AS i
+    """), {
+        'words': BENCH_WORDS,
+        'word_count': len(BENCH_WORDS),
+        'prefix': BENCH_SKU_PREFIX,
+        'start': existing,
+        'stop': count - 1
+    })
+    db.session.commit()
+    db.session.execute(text('ANALYZE products'))
+    db.session.commit()
+
+def clear_bench_products():
+    db.session.execute(text("DELETE FROM inventory WHERE product_id IN "
+                            "(SELECT id FROM products WHERE sku LIKE :prefix)"), {'prefix': f'{BENCH_SKU_PREFIX}%'})
+    db.session.execute(text("DELETE FROM manufacturer_sales_weekly WHERE product_id IN "
+                            "(SELECT id FROM products WHERE sku LIKE :prefix)"), {'prefix': f'{BENCH_SKU_PREFIX}%'})
+    db.session.execute(text("DELETE FROM products WHERE sku LIKE :prefix"), {'prefix': f'{BENCH_SKU_PREFIX}%'})
+    db.session.commit()
+
+BENCH_EMAIL_DOMAIN = '@bench.auromart.local'
+
+def create_bench_partners():
+    """A throwaway retailer and distributor for benchmarks that place orders"""
+    from app.models import User
+    retailer = User(email=f'retailer{BENCH_EMAIL_DOMAIN}', first_name='Bench', last_name='Retailer', role='retailer')
+    distributor = User(email=f'distributor{BENCH_EMAIL_DOMAIN}', first_name='Bench', last_name='Distributor', role='distributor')
+    db.session.add_all([retailer, distributor])
+    db.session.commit()
+    return retailer, distributor
+
+def clear_bench_partners():
+    """Delete the benchmark users and everything they created"""
+    params = {'domain': f'%{BENCH_EMAIL_DOMAIN}'}
+    bench_users = "SELECT id FROM users WHERE email LIKE :domain"
+    db.session.execute(text(f"DELETE FROM order_items WHERE order_id IN "
+                            f"(SELECT id FROM orders WHERE retailer_id IN ({bench_users}))"), params)
+    db.session.execute(text(f"DELETE FROM orders WHERE retailer_id IN ({bench_users})"), params)
+    db.session.execute(text(f"DELETE FROM whatsapp_notifications WHERE user_id IN ({bench_users})"), params)
+    db.session.execute(text(f"DELETE FROM inventory WHERE distributor_id IN ({bench_users})"), params)
+    db.session.execute(text(f"DELETE FROM revoked_tokens WHERE user_id IN ({bench_users})"), params)
+    db.session.execute(text(f"DELETE FROM user_order_stats WHERE user_id IN ({bench_users})"), params)
+    db.session.execute(text(f"DELETE FROM user_stats WHERE user_id IN ({bench_users})"), params)
+    db.session.execute(text(f"DELETE FROM order_daily_rollup WHERE user_id IN ({bench_users})"), params)
+    db.session.execute(text(f"DELETE FROM manufacturer_sales_weekly WHERE distributor_id IN ({bench_users})"), params)
+    db.session.execute(text("DELETE FROM users WHERE email LIKE :domain"), params)
+    db.session.commit()
+
+def seed_bench_inventory(distributors, copies):
+    """Bench distributors stocking every synthetic product copies times over, spread across them"""
+    params = {'domain': f'%{BENCH_EMAIL_DOMAIN}', 'prefix': f'{BENCH_SKU_PREFIX}%'}
+    db.session.execute(text("""
+        INSERT INTO users (id, email, first_name, last_name, role, business_name, is_active, created_at, updated_at)
+        SELECT gen_random_uuid(), 'stockist' || i || :suffix, 'Bench', 'Stockist ' || i,
+               'distributor', 'Bench Stockist ' || i, true, now(), now()
+        FROM generate_series(0, :count - 1) AS i
+    """), {'suffix': BENCH_EMAIL_DOMAIN, 'count': distributors})
+    click.echo(f'Seeding inventory for {distributors} distributors...')
+    db.session.execute(text("""
+        INSERT INTO inventory (id, distributor_id, product_id, quantity, selling_price, is_available, created_at, updated_at)
+        SELECT gen_random_uuid(), d.id, p.id, (p.n * 7 + c.j) % 50, p.base_price + c.j, true, now(), now()
+        FROM (SELECT id, base_price, row_number() OVER (ORDER BY sku) AS n
+              FROM products WHERE sku LIKE :prefix) p
+        CROSS JOIN generate_series(0, :copies - 1) AS c(j)
+        JOIN (SELECT id, row_number() OVER (ORDER BY email) - 1 AS k
+              FROM users WHERE email LIKE 'stockist%' AND email LIKE :domain) d
+          ON d.k = (p.n + c.j * 17) % :distributors
+    """), dict(params, copies=copies, distributors=distributors))
+    db.session.commit()
+    db.session.execute(text('ANALYZE inventory'))
+    db.session.commit()
+
+def register_benchmark_commands(app):
+    """Register benchmark CLI commands"""
+
+    @app.cli.command('bench-search')
+    @click.option('--products', default=1_000_000, help='Catalog size to benchmark against')
+    @click.option('--runs', default=20, help='Queries per search path')
+    @click.option('--keep', is_flag=True, help='Keep the synthetic products afterwards')
+    @with_appcontext
+    def bench_search(products, runs, keep):
+        """Compare ranked product search against the legacy ILIKE scan"""
+        from app.services import product_search
+
+        seed_bench_products(products)
+        terms = ['laptop', 'chair model 42', 'headphnes', f'{BENCH_SKU_PREFIX}00012345', 'synthetic table', 'BENCH-0000']
+
+        try:
+            for term in terms:
+                click.echo(f'Term: {term!r}')
+                report('  legacy ILIKE (all rows)', timed(
+                    lambda i: product_search.legacy_search_products(term), runs))
+                report('  ranked search (page 1)', timed(
+                    lambda i: product_search.search_products(term, limit=20), runs))
+        finally:
+            if not keep:
+                clear_bench_products()
+
+    @app.cli.command('bench-suggest')
+    @click.option('--products', default=1_000_000, help='Catalog size to benchmark against')
+    @click.option('--runs', default=2000, help='Number of lookups')
+    @click.option('--keep', is_flag=True, help='Keep the synthetic products afterwards')
+    @with_appcontext
+    def bench_suggest(products, runs, keep):
+        """Measure typeahead lookup latency for the first 10 suggestions"""
+        import random
+        from app.services import suggest
+
+        seed_bench_products(products)
+        try:
+            start = time.perf_counter()
+            index = suggest.build_index()
+            click.echo(f'Built index of {len(index)} keys in {time.perf_counter() - start:.1f}s')
+
+            words = [word.lower() for word in BENCH_WORDS] + ['bench-00', 'laptop model 12']
+            prefixes = [random.choice(words)[:random.randint(1, 8)] for _ in range(runs)]
+            report('suggest (top 10)', timed(lambda i: index.search(prefixes[i], 10), runs))
+        finally:
+            if not keep:
+                clear_bench_products()
+
+    @app.cli.command('bench-import')
+    @click.option('--rows', default=50_000, help='Rows to import')
+    @click.option('--manufacturer', 'manufacturer_email', required=True, help='Email of the owning manufacturer')
+    @with_appcontext
+    def bench_import(rows, manufacturer_email):
+        """Measure bulk import throughput from an in-memory NDJSON stream"""
+        import io
+        import json
+        from app.models import User
+        from app.services import product_import
+
+        manufacturer = User.query.filter_by(email=manufacturer_email).first()
+        if not manufacturer:
+            raise click.ClickException(f'No user with email {manufacturer_email}')
+
+        body = ''.join(json.dumps({
+            'name': f'{BENCH_WORDS[i % len(BENCH_WORDS)]} Import {i}',
+            'sku': f'{BENCH_SKU_PREFIX}IMP-{i:08d}',
+            'basePrice': f'{i % 1000}.99'
+        }) + '\n' for i in range(rows))
+
+        try:
+            start = time.perf_counter()
+            report = product_import.import_products(
+                product_import.read_records(io.StringIO(body), 'ndjson'),
+                manufacturer.id,
+                batch_size=app.config['BULK_IMPORT_BATCH_SIZE']
+            )
+            elapsed = time.perf_counter() - start
+            click.echo(f'Imported {report.inserted} rows in {elapsed:.2f}s ({report.inserted / elapsed:.0f} rows/s), '
+                       f'{report.failed} failed')
+        finally:
+            clear_bench_products()
+
+    @app.cli.command('bench-orders')
+    @click.option('--runs', default=10, help='Orders created per size')
+    @with_appcontext
+    def bench_orders(runs):
+        """Measure POST /api/orders latency for orders of 10, 100 and 1000 lines"""
+        from flask_jwt_extended import create_access_token
+        from app.models import Product
+        from app.utils.identity import token_claims
+
+        seed_bench_products(1000)
+        retailer, distributor = create_bench_partners()
+        product_ids = [str(pid) for (pid,) in db.session.query(Product.id)
+                       .filter(Product.sku.like(f'{BENCH_SKU_PREFIX}%')).limit(1000)]
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(retailer.id), additional_claims=token_claims(retailer))}'}
+        distributor_id = str(distributor.id)
+        client = app.test_client()
+
+        try:
+            for size in (10, 100, 1000):
+                body = {
+                    'distributorId': distributor_id,
+                    'items': [{'productId': product_ids[i % len(product_ids)], 'quantity': 1, 'unitPrice': 9.99}
+                              for i in range(size)]
+                }
+
+                def create(i):
+                    response = client.post('/api/orders/', json=body, headers=headers)
+                    if response.status_code != 201:
+                        raise click.ClickException(f'Order creation failed: {response.get_json()}')
+
+                report(f'create order ({size} lines)', timed(create, runs))
+        finally:
+            clear_bench_partners()
+            clear_bench_products()
+
+    @app.cli.command('bench-partner-search')
+    @click.option('--products', default=200_000, help='Catalog size to benchmark against')
+    @click.option('--copies', default=5, help='Distributors stocking each product')
+    @click.option('--distributors', default=100, help='Number of distributors')
+    @click.option('--runs', default=50, help='Queries per term and sort')
+    @with_appcontext
+    def bench_partner_search(products, copies, distributors, runs):
+        """Measure ?product= partner lookups against products x copies inventory rows"""
+        from app.services import partner_directory
+
+        seed_bench_products(products)
+        clear_bench_partners()
+        seed_bench_inventory(distributors, copies)
+        terms = ['laptop', 'chair model 42', f'{BENCH_SKU_PREFIX}00012345', 'headphnes']
+
+        try:
+            for term in terms:
+                click.echo(f'Term: {term!r}')
+                for sort in ('relevance', 'price', '-stock'):
+                    report(f'  {sort} (page 1)', timed(lambda i: partner_directory.search_product_partners(
+                        ['distributor'], term, sort, limit=20), runs))
+        finally:
+            clear_bench_partners()
+            clear_bench_products()
+
+    @app.cli.command('bench-login')
+    @click.option('--users', default=50, help='Distinct users logging in')
+    @click.option('--requests', 'total', default=500, help='Login requests in total')
+    @click.option('--concurrency', default=16, help='Concurrent clients')
+    @with_appcontext
+    def bench_login(users, total, concurrency):
+        """Measure POST /api/auth/login throughput and latency under concurrent sign-ins"""
+        from concurrent.futures import ThreadPoolExecutor
+        from werkzeug.security import generate_password_hash
+        from app.models import User
+
+        password = 'bench-password'
+        # One hash shared by every bench user keeps seeding fast
+        password_hash = generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
+        db.session.add_all([
+            User(email=f'login{i}{BENCH_EMAIL_DOMAIN}', first_name='Bench', last_name=f'Login {i}',
+                 role='retailer', password_hash=password_hash)
+            for i in range(users)
+        ])
+        db.session.commit()
+
+        def login(i):
+            client = app.test_client()
+            start = time.perf_counter()
+            response = client.post('/api/auth/login', json={
+                'email': f'login{i % users}{BENCH_EMAIL_DOMAIN}', 'password': password
+            })
+            return response.status_code, (time.perf_counter() - start) * 1000
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(login, range(total)))
+            elapsed = time.perf_counter() - start
+
+            accepted = [ms for status, ms in results if status == 200]
+            rejected = [ms for status, ms in results if status == 503]
+            click.echo(f'{len(accepted)} logins in {elapsed:.2f}s ({len(accepted) / elapsed:.1f}/s), '
+                       f'{len(rejected)} rejected as busy, {total - len(accepted) - len(rejected)} failed '
+                       f'[{app.config["PASSWORD_HASH_WORKERS"]} hashing workers, {app.config["PASSWORD_HASH_METHOD"]}]')
+            if accepted:
+                report('login (accepted)', accepted)
+            if rejected:
+                report('login (rejected)', rejected)
+        finally:
+            clear_bench_partners()
@@ -1,7 +1,8 @@
 import click
 from flask.cli import with_appcontext
+from sqlalchemy import text
 from app import db
-from app.models import User, Category, Product, Order, OrderItem, Partnership, Favorite, WhatsAppNotification
+from app.models import User, Category, Product, Order, OrderItem, Partnership, Favorite, WhatsAppNotification, UserStats, UserOrderStats, OrderDailyRollup, ManufacturerSalesWeekly, RevokedToken
 from datetime import datetime, timedelta
 import uuid
 import random
@@ -13,6 +14,8 @@ def register_commands(app):
     @with_appcontext
     def init_db():
         """Initialize the database"""
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        db.session.commit()
         db.create_all()
         click.echo('Database initialized!')
     
@@ -24,12 +27,17 @@ def register_commands(app):
         # Clear existing data
         click.echo('Clearing existing data...')
         WhatsAppNotification.query.delete()
+        UserOrderStats.query.delete()
+        UserStats.query.delete()
+        OrderDailyRollup.query.delete()
+        ManufacturerSalesWeekly.query.delete()
         OrderItem.query.delete()
         Order.query.delete()
         Product.query.delete()
         Category.query.delete()
         Partnership.query.delete()
         Favorite.query.delete()
+        RevokedToken.query.delete()
         User.query.delete()
         db.session.commit()
         
@@ -387,7 +395,7 @@ def register_commands(app):
                 id=str(uuid.uuid4()),
                 requester_id=retailers[0].id,
                 partner_id=distributors[0].id,
-                status='accepted',
+                status='approved',
                 partnership_type='retailer_distributor',
                 created_at=datetime.utcnow() - timedelta(days=30)
             ),
@@ -395,7 +403,7 @@ def register_commands(app):
                 id=str(uuid.uuid4()),
                 requester_id=retailers[1].id,
                 partner_id=distributors[1].id,
-                status='accepted',
+                status='approved',
                 partnership_type='retailer_distributor',
                 created_at=datetime.utcnow() - timedelta(days=25)
             ),
@@ -403,7 +411,7 @@ def register_commands(app):
                 id=str(uuid.uuid4()),
                 requester_id=distributors[0].id,
                 partner_id=manufacturers[0].id,
-                status='accepted',
+                status='approved',
                 partnership_type='distributor_manufacturer',
                 created_at=datetime.utcnow() - timedelta(days=20)
             ),
@@ -411,7 +419,7 @@ def register_commands(app):
                 id=str(uuid.uuid4()),
                 requester_id=distributors[1].id,
                 partner_id=manufacturers[1].id,
-                status='accepted',
+                status='approved',
                 partnership_type='distributor_manufacturer',
                 created_at=datetime.utcnow() - timedelta(days=15)
             )
@@ -484,6 +492,12 @@ def register_commands(app):
             db.session.add(notification)
         db.session.commit()
         
+        # Seed rows are added directly, so compute the dashboard counters in one pass
+        from app.services import analytics
+        analytics.rebuild_user_stats()
+        analytics.backfill_order_rollup()
+        analytics.refresh_manufacturer_sales()
+        
         click.echo('Database seeded with comprehensive sample data!')
         click.echo(f'Created:')
         click.echo(f'- {len(categories)} categories')
@@ -518,6 +532,94 @@ def register_commands(app):
         
         click.echo(f'Admin user {email} created successfully!')
     
+    @app.cli.command()
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--manufacturer', 'manufacturer_email', required=True, help='Email of the owning manufacturer')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension')
+    @click.option('--upsert', is_flag=True, help='Update products whose SKU already exists')
+    @with_appcontext
+    def import_products(path, manufacturer_email, fmt, upsert):
+        """Import products from a CSV or NDJSON file"""
+        from app.services import product_import
+        
+        manufacturer = User.query.filter_by(email=manufacturer_email).first()
+        if not manufacturer:
+            raise click.ClickException(f'No user with email {manufacturer_email}')
+        
+        fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        with open(path, encoding='utf-8', newline='') as stream:
+            report = product_import.import_products(
+                product_import.read_records(stream, fmt),
+                manufacturer.id,
+                upsert=upsert,
+                batch_size=app.config['BULK_IMPORT_BATCH_SIZE'],
+                max_errors=app.config['BULK_IMPORT_MAX_ERRORS']
+            )
+        
+        result = report.to_dict()
+        click.echo(f"Inserted {result['inserted']}, updated {result['updated']}, failed {result['failed']}")
+        for error in result['errors']:
+            click.echo(f"Row {error['row']} ({error['sku']}): {error['errors']}")
+    
+    @app.cli.command()
+    @with_appcontext
+    def rebuild_stats():
+        """Recompute the per-user dashboard counters from orders, products and partnerships"""
+        from app.services import analytics
+        
+        analytics.rebuild_user_stats()
+        click.echo(f'Rebuilt stats for {UserStats.query.count()} users')
+    
+    @app.cli.command()
+    @click.option('--from', 'start', type=click.DateTime(formats=['%Y-%m-%d']), help='First day to rebuild')
+    @click.option('--to', 'end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day to rebuild')
+    @with_appcontext
+    def backfill_order_rollup(start, end):
+        """Rebuild the daily order rollup from orders, for all days or a date range"""
+        from app.services import analytics
+        
+        rows = analytics.backfill_order_rollup(start.date() if start else None, end.date() if end else None)
+        click.echo(f'Wrote {rows} daily rollup rows')
+    
+    @app.cli.command()
+    @click.option('--weeks', type=int, help='Only rebuild this many recent weeks (default: all)')
+    @with_appcontext
+    def refresh_manufacturer_sales(weeks):
+        """Rebuild the weekly manufacturer sales summary from order lines"""
+        from app.services import analytics
+        
+        since = datetime.utcnow().date() - timedelta(weeks=weeks) if weeks else None
+        if not analytics.refresh_manufacturer_sales(since):
+            raise click.ClickException('Another refresh is already running')
+        click.echo('Manufacturer sales summary refreshed')
+    
+    @app.cli.command()
+    @click.option('--retention-days', type=int, help='Defaults to SEARCH_HISTORY_RETENTION_DAYS')
+    @click.option('--max-per-user', type=int, help='Defaults to SEARCH_HISTORY_MAX_PER_USER')
+    @with_appcontext
+    def compact_search_history(retention_days, max_per_user):
+        """Expire old searches, merge repeated terms and cap rows per user"""
+        from app.services import search_history
+        
+        if retention_days is None:
+            retention_days = app.config['SEARCH_HISTORY_RETENTION_DAYS']
+        if max_per_user is None:
+            max_per_user = app.config['SEARCH_HISTORY_MAX_PER_USER']
+        
+        result = search_history.compact_search_history(retention_days, max_per_user)
+        if result is None:
+            raise click.ClickException('Another compaction is already running')
+        click.echo(f"Removed {result['expired']} expired, {result['merged']} merged "
+                   f"and {result['trimmed']} over the per-user limit")
+    
+    @app.cli.command()
+    @with_appcontext
+    def prune_revoked_tokens():
+        """Delete revoked refresh tokens that have expired anyway"""
+        from app.services import token_revocation
+        
+        click.echo(f'Deleted {token_revocation.prune_revoked_tokens()} expired revocations')
+    
     @app.cli.command()
     @with_appcontext
     def list_users():
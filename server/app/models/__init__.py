@@ -8,6 +8,9 @@ from .favorite import Favorite
 from .search_history import SearchHistory
 from .whatsapp import WhatsAppNotification
 from .invoice import Invoice
+from .trending import TrendingCheckpoint
+from .revoked_token import RevokedToken
+from .analytics import UserStats, UserOrderStats, OrderDailyRollup, ManufacturerSalesWeekly, SummaryRefresh
 
 __all__ = [
     'User',
@@ -20,5 +23,12 @@ __all__ = [
     'Favorite',
     'SearchHistory',
     'WhatsAppNotification',
-    'Invoice'
+    'Invoice',
+    'UserStats',
+    'UserOrderStats',
+    'OrderDailyRollup',
+    'ManufacturerSalesWeekly',
+    'SummaryRefresh',
+    'TrendingCheckpoint',
+    'RevokedToken'
 ] 
\ No newline at end of file
@@ -0,0 +1,65 @@
+from app import db
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import UUID
+
+class UserStats(db.Model):
+    """Per-user dashboard counters, maintained alongside the writes they count"""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), primary_key=True)
+    total_products = db.Column(db.Integer, nullable=False, default=0)
+    active_partners = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserStats {self.user_id}>'
+
+class UserOrderStats(db.Model):
+    """Order count and revenue per user and order status"""
+    __tablename__ = 'user_order_stats'
+    
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserOrderStats {self.user_id} {self.status}>'
+
+class OrderDailyRollup(db.Model):
+    """Orders and revenue per user, day of order creation and current order status"""
+    __tablename__ = 'order_daily_rollup'
+    
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<OrderDailyRollup {self.user_id} {self.day} {self.status}>'
+
+class ManufacturerSalesWeekly(db.Model):
+    """Units and revenue per manufacturer, week, product and distributor, rebuilt periodically"""
+    __tablename__ = 'manufacturer_sales_weekly'
+    
+    manufacturer_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), primary_key=True)
+    week = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(UUID(as_uuid=True), db.ForeignKey('products.id'), primary_key=True)
+    distributor_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), primary_key=True)
+    units = db.Column(db.BigInteger, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    order_lines = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ManufacturerSalesWeekly {self.manufacturer_id} {self.week}>'
+
+class SummaryRefresh(db.Model):
+    """When each periodically rebuilt summary table was last refreshed"""
+    __tablename__ = 'summary_refreshes'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<SummaryRefresh {self.name}>'
@@ -5,6 +5,12 @@ from sqlalchemy.dialects.postgresql import UUID
 
 class Inventory(db.Model):
     __tablename__ = 'inventory'
+    __table_args__ = (
+        # Product -> distributor lookup of in-stock offers, answered from the index alone
+        db.Index('idx_inventory_product_in_stock', 'product_id', 'distributor_id',
+                 postgresql_include=['selling_price', 'quantity'],
+                 postgresql_where=db.text('is_available AND quantity > 0')),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     distributor_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
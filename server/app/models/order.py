@@ -5,6 +5,11 @@ from sqlalchemy.dialects.postgresql import UUID
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('idx_orders_retailer_created', 'retailer_id', 'created_at', 'id'),
+        db.Index('idx_orders_distributor_created', 'distributor_id', 'created_at', 'id'),
+        db.Index('idx_orders_created', 'created_at'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_number = db.Column(db.String(255), unique=True, nullable=False)
@@ -20,11 +25,11 @@ class Order(db.Model):
     # Relationships
     retailer = db.relationship('User', foreign_keys=[retailer_id], backref='retailer_orders')
     distributor = db.relationship('User', foreign_keys=[distributor_id], backref='distributor_orders')
-    items = db.relationship('OrderItem', backref='order', lazy='dynamic', cascade='all, delete-orphan')
+    items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan')
     
-    def to_dict(self):
-        """Convert to dictionary"""
-        return {
+    def to_dict(self, items=None, include_items=True):
+        """Convert to dictionary; pass items (already serialized) to skip loading them"""
+        data = {
             'id': str(self.id),
             'orderNumber': self.order_number,
             'retailerId': str(self.retailer_id),
@@ -34,15 +39,21 @@ class Order(db.Model):
             'totalAmount': float(self.total_amount) if self.total_amount else None,
             'notes': self.notes,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
-            'items': [item.to_dict() for item in self.items]
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_items:
+            data['items'] = items if items is not None else [item.to_dict() for item in self.items]
+        return data
     
     def __repr__(self):
         return f'<Order {self.order_number}>'
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        db.Index('idx_order_items_order', 'order_id'),
+        db.Index('idx_order_items_product', 'product_id'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id = db.Column(UUID(as_uuid=True), db.ForeignKey('orders.id'), nullable=False)
@@ -54,8 +65,10 @@ class OrderItem(db.Model):
     # Relationships
     product = db.relationship('Product', backref='order_items')
     
-    def to_dict(self):
-        """Convert to dictionary"""
+    def to_dict(self, product=None):
+        """Convert to dictionary; pass product to avoid loading it"""
+        if product is None:
+            product = self.product
         return {
             'id': str(self.id),
             'orderId': str(self.order_id),
@@ -63,7 +76,7 @@ class OrderItem(db.Model):
             'quantity': self.quantity,
             'unitPrice': float(self.unit_price),
             'totalPrice': float(self.total_price),
-            'product': self.product.to_dict() if self.product else None
+            'product': product.to_dict() if product else None
         }
     
     def __repr__(self):
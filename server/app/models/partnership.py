@@ -5,6 +5,10 @@ from sqlalchemy.dialects.postgresql import UUID
 
 class Partnership(db.Model):
     __tablename__ = 'partnerships'
+    __table_args__ = (
+        db.UniqueConstraint('requester_id', 'partner_id', name='uq_partnerships_requester_partner'),
+        db.Index('idx_partnerships_partner_requester', 'partner_id', 'requester_id'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     requester_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
@@ -18,18 +22,21 @@ class Partnership(db.Model):
     requester = db.relationship('User', foreign_keys=[requester_id], backref='sent_partnerships')
     partner = db.relationship('User', foreign_keys=[partner_id], backref='received_partnerships')
     
-    def to_dict(self):
-        """Convert to dictionary"""
-        return {
+    def to_dict(self, embed=('partner',)):
+        """Convert to dictionary, embedding the public profile of each side named in embed"""
+        data = {
             'id': str(self.id),
             'requesterId': str(self.requester_id),
             'partnerId': str(self.partner_id),
             'status': self.status,
             'partnershipType': self.partnership_type,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
-            'partner': self.partner.to_public_dict() if self.partner else None
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
         }
+        for side in embed:
+            user = getattr(self, side)
+            data[side] = user.to_public_dict() if user else None
+        return data
     
     def __repr__(self):
         return f'<Partnership {self.requester_id} -> {self.partner_id}>' 
\ No newline at end of file
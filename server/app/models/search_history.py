@@ -5,12 +5,23 @@ from sqlalchemy.dialects.postgresql import UUID
 
 class SearchHistory(db.Model):
     __tablename__ = 'search_history'
+    __table_args__ = (
+        # Covers the recent-history read, so it is answered from the index alone
+        db.Index(
+            'idx_search_history_user_created',
+            'user_id',
+            db.text('created_at DESC'),
+            postgresql_include=['id', 'search_term', 'search_type', 'result_count', 'search_count']
+        ),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
     search_term = db.Column(db.String(255), nullable=False)
     search_type = db.Column(db.String(50), nullable=False)
     result_count = db.Column(db.Integer, nullable=False)
+    # Searches merged into this row by compaction; created_at is then the last one
+    search_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -24,8 +35,9 @@ class SearchHistory(db.Model):
             'searchTerm': self.search_term,
             'searchType': self.search_type,
             'resultCount': self.result_count,
+            'searchCount': self.search_count or 1,
             'createdAt': self.created_at.isoformat() if self.created_at else None
         }
     
     def __repr__(self):
-        return f'<SearchHistory {self.search_term} - {self.result_count}>' 
\ No newline at end of file
+        return f'<SearchHistory {self.search_term} - {self.result_count}>'
@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+
+class TrendingCheckpoint(db.Model):
+    """Checkpointed Space-Saving counters of one worker for one trending time bucket"""
+    __tablename__ = 'trending_checkpoints'
+    __table_args__ = (
+        db.Index('idx_trending_checkpoints_lookup', 'search_type', 'period', 'bucket_start'),
+    )
+    
+    worker = db.Column(db.String(100), primary_key=True)
+    search_type = db.Column(db.String(50), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    counters = db.Column(JSONB, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TrendingCheckpoint {self.worker} {self.search_type} {self.period} {self.bucket_start}>'
@@ -1,11 +1,17 @@
 from app import db
 from datetime import datetime
 import uuid
+from flask import current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import deferred
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('idx_users_search_document_trgm', 'search_document', postgresql_using='gin',
+                 postgresql_ops={'search_document': 'gin_trgm_ops'}),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = db.Column(db.String(255), unique=True, nullable=True)
@@ -19,9 +25,18 @@ class User(db.Model):
     whatsapp_number = db.Column(db.String(50), nullable=True)
     password_hash = db.Column(db.String(255), nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    # Bumped on role change or deactivation; tokens carrying an older version are refused
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Partner directory search text, maintained by PostgreSQL as a generated column
+    search_document = deferred(db.Column(db.Text, db.Computed(
+        "lower(coalesce(business_name, '') || ' ' || coalesce(first_name, '') || ' ' || "
+        "coalesce(last_name, '') || ' ' || coalesce(email, ''))",
+        persisted=True
+    )))
+    
     def __init__(self, **kwargs):
         password = kwargs.pop('password', None)
         super(User, self).__init__(**kwargs)
@@ -29,8 +44,8 @@ class User(db.Model):
             self.set_password(password)
     
     def set_password(self, password):
-        """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        """Set password hash on the calling thread; request handlers use the passwords service"""
+        self.password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
     
     def check_password(self, password):
         """Check password hash"""
@@ -0,0 +1,413 @@
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select, union_all, literal, or_, cast, Date, DateTime
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models import (
+    User, Order, OrderItem, Product, Partnership,
+    UserStats, UserOrderStats, OrderDailyRollup, ManufacturerSalesWeekly
+)
+from app.utils.jobs import try_advisory_xact_lock, mark_refreshed, last_refreshed
+
+ACTIVE_PARTNERSHIP_STATUS = 'approved'
+COMPLETED_ORDER_STATUS = 'delivered'
+
+def _distinct(user_ids):
+    # An upsert may touch each row only once
+    return {str(user_id) for user_id in user_ids}
+
+def _bump_order_stats(model, user_ids, status, orders, revenue, **key):
+    """Add to the order count and revenue of status for each user, in one upsert"""
+    if not status:
+        return
+    table = model.__table__
+    stmt = insert(table).values([
+        dict(key, user_id=user_id, status=status, order_count=orders, revenue=revenue)
+        for user_id in _distinct(user_ids)
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={
+            'order_count': table.c.order_count + stmt.excluded.order_count,
+            'revenue': table.c.revenue + stmt.excluded.revenue
+        }
+    ))
+
+def _bump_user_stats(user_ids, **deltas):
+    """Add deltas to counters of user_stats for each user, in one upsert"""
+    table = UserStats.__table__
+    now = datetime.utcnow()
+    stmt = insert(table).values([dict(deltas, user_id=user_id, updated_at=now) for user_id in _distinct(user_ids)])
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in deltas}
+    set_['updated_at'] = now
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_=set_))
+
+def record_order_created(order):
+    """Count a new order for its retailer and distributor; runs in the caller's transaction"""
+    parties = [order.retailer_id, order.distributor_id]
+    amount = order.total_amount or 0
+    _bump_order_stats(UserOrderStats, parties, order.status, 1, amount)
+    _bump_order_stats(OrderDailyRollup, parties, order.status, 1, amount, day=order.created_at.date())
+
+def record_order_status_change(order, old_status):
+    """Move an order between status counters of its retailer and distributor.
+
+    Daily rollup rows stay keyed by the day the order was placed, so a
+    status change only moves counts between statuses of that day.
+    """
+    if old_status == order.status:
+        return
+    parties = [order.retailer_id, order.distributor_id]
+    amount = order.total_amount or 0
+    day = order.created_at.date()
+    for model, key in ((UserOrderStats, {}), (OrderDailyRollup, {'day': day})):
+        _bump_order_stats(model, parties, old_status, -1, -amount, **key)
+        _bump_order_stats(model, parties, order.status, 1, amount, **key)
+
+def record_products_created(manufacturer_id, count=1):
+    if count:
+        _bump_user_stats([manufacturer_id], total_products=count)
+
+def record_partnership_status_change(partnership, old_status):
+    """Keep active_partners of both sides in step with a partnership's approval"""
+    was_active = old_status == ACTIVE_PARTNERSHIP_STATUS
+    is_active = partnership.status == ACTIVE_PARTNERSHIP_STATUS
+    if was_active != is_active:
+        _bump_user_stats(
+            [partnership.requester_id, partnership.partner_id],
+            active_partners=1 if is_active else -1
+        )
+
+def get_user_stats(user):
+    """Dashboard stats of a user, read from the rollup tables"""
+    stats = {
+        'total_orders': 0,
+        'total_revenue': 0,
+        'pending_orders': 0,
+        'completed_orders': 0,
+        'total_products': 0,
+        'active_partners': 0
+    }
+
+    counters = db.session.get(UserStats, user.id)
+    if counters:
+        stats['total_products'] = counters.total_products
+        stats['active_partners'] = counters.active_partners
+
+    if user.role in ('retailer', 'distributor'):
+        rows = db.session.query(UserOrderStats.status, UserOrderStats.order_count, UserOrderStats.revenue)\
+            .filter(UserOrderStats.user_id == user.id)\
+            .all()
+        for status, order_count, revenue in rows:
+            stats['total_orders'] += order_count
+            if user.role == 'retailer':
+                stats['total_revenue'] += revenue
+            if status == 'pending':
+                stats['pending_orders'] = order_count
+            elif status == COMPLETED_ORDER_STATUS:
+                stats['completed_orders'] = order_count
+
+    return stats
+
+def rebuild_user_stats():
+    """Recompute both rollup tables from scratch with set-based aggregates.
+
+    Run after bulk changes that bypass the API, or to repair drift. Both
+    tables are rewritten in one transaction, so readers never see them
+    half-built.
+    """
+    order_stats = UserOrderStats.__table__
+    user_stats = UserStats.__table__
+
+    per_party = [
+        select(
+            party.label('user_id'),
+            Order.status.label('status'),
+            func.count().label('order_count'),
+            func.coalesce(func.sum(Order.total_amount), 0).label('revenue')
+        ).where(Order.status.isnot(None)).group_by(party, Order.status)
+        for party in (Order.retailer_id, Order.distributor_id)
+    ]
+
+    product_count = select(func.count())\
+        .where(Product.manufacturer_id == User.id)\
+        .scalar_subquery()
+    partner_count = select(func.count())\
+        .where(
+            Partnership.status == ACTIVE_PARTNERSHIP_STATUS,
+            or_(Partnership.requester_id == User.id, Partnership.partner_id == User.id)
+        )\
+        .scalar_subquery()
+
+    db.session.execute(order_stats.delete())
+    db.session.execute(user_stats.delete())
+    db.session.execute(order_stats.insert().from_select(
+        ['user_id', 'status', 'order_count', 'revenue'], union_all(*per_party)
+    ))
+    db.session.execute(user_stats.insert().from_select(
+        ['user_id', 'total_products', 'active_partners', 'updated_at'],
+        select(User.id, product_count, partner_count, literal(datetime.utcnow()))
+    ))
+    db.session.commit()
+
+TIMESERIES_GRANULARITIES = ('day', 'week', 'month')
+
+def period_start(day, granularity):
+    """First day of the period containing day, matching PostgreSQL date_trunc"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_period(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+def order_timeseries(user_id, granularity, start, end, statuses=None):
+    """Order count and revenue per period between two dates, inclusive.
+
+    Reads only order_daily_rollup rows of the user in the range (a primary
+    key range scan); periods without orders are returned as zeros so the
+    series has no gaps.
+    """
+    # Truncate as a plain timestamp so the buckets do not depend on the session time zone
+    bucket = cast(func.date_trunc(granularity, cast(OrderDailyRollup.day, DateTime)), Date)
+    query = db.session.query(bucket, func.sum(OrderDailyRollup.order_count), func.sum(OrderDailyRollup.revenue))\
+        .filter(
+            OrderDailyRollup.user_id == user_id,
+            OrderDailyRollup.day >= start,
+            OrderDailyRollup.day <= end
+        )
+    if statuses:
+        query = query.filter(OrderDailyRollup.status.in_(statuses))
+    totals = {period: (orders, revenue) for period, orders, revenue in query.group_by(bucket).all()}
+
+    series = []
+    period = period_start(start, granularity)
+    while period <= end:
+        orders, revenue = totals.get(period, (0, 0))
+        series.append({'period': period.isoformat(), 'orders': int(orders), 'revenue': float(revenue)})
+        period = next_period(period, granularity)
+    return series
+
+def backfill_order_rollup(start=None, end=None):
+    """Rebuild order_daily_rollup from orders, for every day or a date range.
+
+    Rows of the range are deleted and recomputed with one grouped INSERT ...
+    SELECT per party, in a single transaction. Returns the rows written.
+    """
+    table = OrderDailyRollup.__table__
+    order_day = cast(Order.created_at, Date)
+
+    delete = table.delete()
+    conditions = [Order.status.isnot(None)]
+    if start:
+        delete = delete.where(table.c.day >= start)
+        conditions.append(order_day >= start)
+    if end:
+        delete = delete.where(table.c.day <= end)
+        conditions.append(order_day <= end)
+
+    per_party = [
+        select(
+            party.label('user_id'),
+            order_day.label('day'),
+            Order.status.label('status'),
+            func.count().label('order_count'),
+            func.coalesce(func.sum(Order.total_amount), 0).label('revenue')
+        ).where(*conditions).group_by(party, order_day, Order.status)
+        for party in (Order.retailer_id, Order.distributor_id)
+    ]
+
+    db.session.execute(delete)
+    result = db.session.execute(table.insert().from_select(
+        ['user_id', 'day', 'status', 'order_count', 'revenue'], union_all(*per_party)
+    ))
+    db.session.commit()
+    return result.rowcount
+
+MANUFACTURER_SALES = 'manufacturer_sales_weekly'
+MANUFACTURER_SALES_LOCK = 0x4d53574b
+EXCLUDED_SALES_STATUSES = ('rejected', 'cancelled')
+
+_sales_refresh_lock = threading.Lock()
+_sales_refreshing = False
+
+def refresh_manufacturer_sales(since=None):
+    """Rebuild manufacturer_sales_weekly from order lines, for every week or from since on.
+
+    One grouped INSERT ... SELECT over order_items joined with orders and
+    products replaces the affected weeks in a single transaction. A
+    transaction-level advisory lock keeps workers from refreshing at the
+    same time; returns False when another refresh holds it.
+    """
+    if not try_advisory_xact_lock(MANUFACTURER_SALES_LOCK):
+        db.session.rollback()
+        return False
+
+    table = ManufacturerSalesWeekly.__table__
+    week = cast(func.date_trunc('week', Order.created_at), Date)
+
+    delete = table.delete()
+    conditions = [
+        Product.manufacturer_id.isnot(None),
+        func.coalesce(Order.status, 'pending').notin_(EXCLUDED_SALES_STATUSES)
+    ]
+    if since:
+        since = period_start(since, 'week')
+        delete = delete.where(table.c.week >= since)
+        conditions.append(Order.created_at >= since)
+
+    sales = select(
+        Product.manufacturer_id,
+        week,
+        OrderItem.product_id,
+        Order.distributor_id,
+        func.sum(OrderItem.quantity),
+        func.sum(OrderItem.total_price),
+        func.count()
+    ).select_from(OrderItem)\
+        .join(Order, Order.id == OrderItem.order_id)\
+        .join(Product, Product.id == OrderItem.product_id)\
+        .where(*conditions)\
+        .group_by(Product.manufacturer_id, week, OrderItem.product_id, Order.distributor_id)
+
+    db.session.execute(delete)
+    db.session.execute(table.insert().from_select(
+        ['manufacturer_id', 'week', 'product_id', 'distributor_id', 'units', 'revenue', 'order_lines'], sales
+    ))
+
+    mark_refreshed(MANUFACTURER_SALES)
+    db.session.commit()
+    return True
+
+def _refresh_sales_in_background(app, since):
+    global _sales_refreshing
+    try:
+        with app.app_context():
+            refresh_manufacturer_sales(since)
+    except Exception as e:
+        app.logger.error(f'Manufacturer sales refresh failed: {e}')
+    finally:
+        _sales_refreshing = False
+
+def ensure_manufacturer_sales_fresh():
+    """Time of the last refresh; starts a background refresh once it is older than the interval.
+
+    A periodic refresh only rebuilds the most recent weeks, where new orders
+    and status changes land; the first refresh rebuilds every week.
+    """
+    global _sales_refreshing
+    config = current_app.config
+    refreshed_at = last_refreshed(MANUFACTURER_SALES)
+
+    stale = refreshed_at is None or \
+        (datetime.utcnow() - refreshed_at).total_seconds() > config['MANUFACTURER_ANALYTICS_REFRESH_SECONDS']
+    if stale and not _sales_refreshing:
+        with _sales_refresh_lock:
+            if not _sales_refreshing:
+                _sales_refreshing = True
+                since = None
+                if refreshed_at is not None:
+                    since = datetime.utcnow().date() - timedelta(weeks=config['MANUFACTURER_ANALYTICS_REFRESH_WEEKS'])
+                app = current_app._get_current_object()
+                threading.Thread(target=_refresh_sales_in_background, args=(app, since), daemon=True).start()
+    return refreshed_at
+
+def percent_change(current, previous):
+    if not previous:
+        return None
+    return round(float((current - previous) / previous * 100), 2)
+
+def manufacturer_sales_summary(manufacturer_id, weeks, limit):
+    """Top products, distributor breakdown and week-over-week change of a manufacturer.
+
+    Every query is a range scan of the manufacturer's rows in
+    manufacturer_sales_weekly over the last `weeks` weeks (the current,
+    partial week included). Week over week compares the last two full weeks.
+    """
+    this_week = period_start(datetime.utcnow().date(), 'week')
+    last_week = this_week - timedelta(weeks=1)
+    week_before = this_week - timedelta(weeks=2)
+    start = this_week - timedelta(weeks=weeks - 1)
+
+    sales = ManufacturerSalesWeekly
+    units = func.sum(sales.units)
+    revenue = func.sum(sales.revenue)
+
+    def in_window(query):
+        return query.filter(sales.manufacturer_id == manufacturer_id, sales.week >= start)
+
+    def top_products(order_by):
+        return in_window(db.session.query(sales.product_id, units, revenue))\
+            .group_by(sales.product_id)\
+            .order_by(order_by.desc(), sales.product_id)\
+            .limit(limit)\
+            .all()
+
+    by_units = top_products(units)
+    by_revenue = top_products(revenue)
+    by_distributor = in_window(db.session.query(sales.distributor_id, units, revenue, func.sum(sales.order_lines)))\
+        .group_by(sales.distributor_id)\
+        .order_by(revenue.desc(), sales.distributor_id)\
+        .all()
+    weekly = db.session.query(sales.week, units, revenue)\
+        .filter(sales.manufacturer_id == manufacturer_id, sales.week.in_([last_week, week_before]))\
+        .group_by(sales.week)\
+        .all()
+    weekly = {week: (week_units, week_revenue) for week, week_units, week_revenue in weekly}
+
+    product_ids = {row[0] for row in by_units + by_revenue}
+    products = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(product_ids)).all()
+    } if product_ids else {}
+    distributor_ids = [row[0] for row in by_distributor]
+    distributors = {
+        user.id: user
+        for user in User.query.filter(User.id.in_(distributor_ids)).all()
+    } if distributor_ids else {}
+
+    def product_row(product_id, product_units, product_revenue):
+        product = products.get(product_id)
+        return {
+            'productId': str(product_id),
+            'name': product.name if product else None,
+            'sku': product.sku if product else None,
+            'units': int(product_units),
+            'revenue': float(product_revenue)
+        }
+
+    def distributor_row(distributor_id, distributor_units, distributor_revenue, order_lines):
+        distributor = distributors.get(distributor_id)
+        return {
+            'distributorId': str(distributor_id),
+            'name': (distributor.business_name or distributor.full_name) if distributor else None,
+            'units': int(distributor_units),
+            'revenue': float(distributor_revenue),
+            'orderLines': int(order_lines)
+        }
+
+    current_units, current_revenue = weekly.get(last_week, (0, 0))
+    previous_units, previous_revenue = weekly.get(week_before, (0, 0))
+
+    return {
+        'from': start.isoformat(),
+        'topProductsByUnits': [product_row(*row) for row in by_units],
+        'topProductsByRevenue': [product_row(*row) for row in by_revenue],
+        'distributors': [distributor_row(*row) for row in by_distributor],
+        'weekOverWeek': {
+            'week': last_week.isoformat(),
+            'units': int(current_units),
+            'revenue': float(current_revenue),
+            'previousUnits': int(previous_units),
+            'previousRevenue': float(previous_revenue),
+            'unitsChange': percent_change(current_units, previous_units),
+            'revenueChange': percent_change(current_revenue, previous_revenue)
+        }
+    }
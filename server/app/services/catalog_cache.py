@@ -0,0 +1,15 @@
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.models import Category
+from app.utils.cache import PayloadCache, on_commit
+
+categories_cache = PayloadCache()
+
+def _invalidate_categories(mapper, connection, target):
+    on_commit(object_session(target), categories_cache.invalidate)
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Category, _event, _invalidate_categories)
+
+def load_categories():
+    return [cat.to_dict() for cat in Category.query.order_by(Category.name).all()]
@@ -0,0 +1,93 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import current_app
+from app import db
+from app.models import Favorite
+
+class FavoriteSetCache:
+    """Process-local LRU cache of each user's set of favorited user ids.
+
+    add() and remove() keep a cached set in step with this process's
+    writes. Sets expire after ttl seconds so changes made through other
+    processes show up. A load racing with a write is not stored, as in
+    PayloadCache, so it can never bring back a set the write changed.
+    """
+
+    def __init__(self, max_users, ttl):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.version = 0
+        self.sets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """Favorited ids of a user, calling load() for them on a miss"""
+        user_id = str(user_id)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.sets.get(user_id)
+            if entry and entry[0] > now:
+                self.sets.move_to_end(user_id)
+                return entry[1]
+            version = self.version
+
+        ids = frozenset(str(favorite_id) for favorite_id in load())
+
+        with self.lock:
+            if version == self.version:
+                self.sets[user_id] = (now + self.ttl, ids)
+                self.sets.move_to_end(user_id)
+                while len(self.sets) > self.max_users:
+                    self.sets.popitem(last=False)
+        return ids
+
+    def _update(self, user_id, change):
+        with self.lock:
+            self.version += 1
+            entry = self.sets.get(str(user_id))
+            if entry:
+                self.sets[str(user_id)] = (entry[0], change(entry[1]))
+
+    def add(self, user_id, favorite_user_id):
+        favorite_user_id = str(uuid.UUID(str(favorite_user_id)))
+        self._update(user_id, lambda ids: ids | {favorite_user_id})
+
+    def remove(self, user_id, favorite_user_id):
+        favorite_user_id = str(uuid.UUID(str(favorite_user_id)))
+        self._update(user_id, lambda ids: ids - {favorite_user_id})
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = current_app.config
+                _cache = FavoriteSetCache(config['FAVORITES_CACHE_USERS'], config['FAVORITES_CACHE_TTL'])
+    return _cache
+
+def is_favorite(ids, user_id):
+    """Whether a user id in any UUID spelling is in a set from favorite_ids"""
+    try:
+        return str(uuid.UUID(str(user_id))) in ids
+    except ValueError:
+        return False
+
+def favorite_ids(user_id):
+    """Ids of the users a user has favorited, as strings"""
+    return get_cache().get(user_id, lambda: [
+        favorite_id for (favorite_id,) in
+        db.session.query(Favorite.favorite_user_id).filter(Favorite.user_id == user_id)
+    ])
+
+def favorite_added(user_id, favorite_user_id):
+    """Record a committed favorite in this process's cache"""
+    get_cache().add(user_id, favorite_user_id)
+
+def favorite_removed(user_id, favorite_user_id):
+    """Record a committed removal in this process's cache"""
+    get_cache().remove(user_id, favorite_user_id)
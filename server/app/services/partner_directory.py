@@ -0,0 +1,183 @@
+from flask import current_app
+from sqlalchemy import event, or_, func, literal, null, union_all
+from sqlalchemy.orm import object_session
+from app import db
+from app.models import User, Partnership, Product, Inventory
+from app.services.product_search import escape_like, match_products
+from app.utils.cache import PayloadCache, on_commit
+from app.utils.pagination import encode_offset_cursor
+
+# Roles each role can partner with
+PARTNER_ROLES = {
+    'retailer': ['distributor'],
+    'distributor': ['retailer', 'manufacturer'],
+    'manufacturer': ['distributor']
+}
+
+# Orders for partners found through a product; id keeps offset pages stable on ties
+PRODUCT_PARTNER_SORTS = ('relevance', 'price', '-price', 'stock', '-stock')
+
+# Serialized directory pages keyed by roles, search term and page
+directory_cache = PayloadCache(max_entries=1024)
+
+# Columns a directory page shows or is searched and filtered on
+DIRECTORY_FIELDS = (
+    'email', 'first_name', 'last_name', 'role', 'business_name',
+    'address', 'phone_number', 'whatsapp_number', 'is_active'
+)
+
+def _invalidate_directory(mapper, connection, target):
+    on_commit(object_session(target), directory_cache.invalidate)
+
+def _invalidate_directory_on_change(mapper, connection, target):
+    # Logins and password changes also update users; they leave the directory as is
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in DIRECTORY_FIELDS):
+        on_commit(state.session, directory_cache.invalidate)
+
+event.listen(User, 'after_insert', _invalidate_directory)
+event.listen(User, 'after_delete', _invalidate_directory)
+event.listen(User, 'after_update', _invalidate_directory_on_change)
+
+def normalize_term(term):
+    """Lowercase and collapse whitespace, matching how search_document is built"""
+    return ' '.join(term.lower().split())
+
+def unpartnered_with(user_id):
+    """Filter for users with no partnership with user_id, in either direction and of any status.
+
+    Two NOT EXISTS anti-joins, each a single probe of a composite
+    partnerships index, instead of a NOT IN list of the user's partners.
+    """
+    sent = Partnership.query.filter(
+        Partnership.requester_id == user_id,
+        Partnership.partner_id == User.id
+    ).exists()
+    received = Partnership.query.filter(
+        Partnership.requester_id == User.id,
+        Partnership.partner_id == user_id
+    ).exists()
+    return ~sent & ~received
+
+def directory_query(roles, term='', exclude_user_id=None, available_to=None):
+    """Query of active users of the given roles matching a search term, and the order to rank them by.
+
+    The term is matched against search_document, a generated lowercase
+    concatenation of business name, first and last name and email, through
+    its trigram GIN index: substring matches as the old per-column ILIKE
+    filters found, plus word similarity so small typos still match.
+    With available_to, users already in a partnership with that user are
+    left out.
+    """
+    query = User.query.filter(User.role.in_(roles), User.is_active == True)
+    if exclude_user_id:
+        query = query.filter(User.id != exclude_user_id)
+    if available_to:
+        query = query.filter(unpartnered_with(available_to))
+
+    term = normalize_term(term)
+    if not term:
+        return query, (User.business_name, User.id)
+
+    query = query.filter(or_(
+        User.search_document.like(f'%{escape_like(term)}%', escape='\\'),
+        literal(term).op('<%')(User.search_document)
+    ))
+    return query, (func.word_similarity(term, User.search_document).desc(), User.id)
+
+def search_directory(roles, term='', limit=20, offset=0, exclude_user_id=None, available_to=None):
+    """Ranked page of a partner directory.
+
+    Returns the users of the requested page and whether more follow.
+    """
+    query, order_by = directory_query(roles, term, exclude_user_id, available_to)
+    users = query.order_by(*order_by).offset(offset).limit(limit + 1).all()
+    return users[:limit], len(users) > limit
+
+def cached_directory(roles, term='', limit=20, offset=0):
+    """Encoded directory page shared by every user who lists these roles.
+
+    Pages are built once per roles, term and page and served as bytes until
+    a directory user is added, changed or deactivated, or the TTL passes.
+    Only pages that are the same for every viewer belong here; per-user
+    views such as available partners are built with search_directory.
+    """
+    term = normalize_term(term)
+
+    def build():
+        users, has_more = search_directory(roles, term, limit, offset)
+        next_cursor = encode_offset_cursor(offset + limit) if has_more else None
+        return [user.to_public_dict() for user in users], next_cursor
+
+    return directory_cache.get(
+        (tuple(sorted(roles)), term, limit, offset), build,
+        current_app.config['PARTNER_DIRECTORY_CACHE_TTL'], paginated=True
+    )
+
+def product_offers(roles, product_ids):
+    """Per partner: how many of the products they offer, their lowest price and total stock.
+
+    Distributors offer what they have in stock: inventory rows that are
+    available with a positive quantity, read through the partial covering
+    index idx_inventory_product_in_stock, which PostgreSQL keeps in step
+    with every inventory write. Manufacturers offer the products they make,
+    at base price and without a stock figure.
+    """
+    selects = []
+    if 'distributor' in roles:
+        selects.append(db.session.query(
+            Inventory.distributor_id.label('partner_id'),
+            func.count(Inventory.product_id.distinct()).label('matched_products'),
+            func.min(func.coalesce(Inventory.selling_price, Product.base_price)).label('lowest_price'),
+            func.sum(Inventory.quantity).label('total_stock')
+        ).join(Product, Product.id == Inventory.product_id).filter(
+            Inventory.product_id.in_(product_ids),
+            Inventory.is_available == True,
+            Inventory.quantity > 0
+        ).group_by(Inventory.distributor_id).statement)
+    if 'manufacturer' in roles:
+        selects.append(db.session.query(
+            Product.manufacturer_id.label('partner_id'),
+            func.count(Product.id).label('matched_products'),
+            func.min(Product.base_price).label('lowest_price'),
+            null().label('total_stock')
+        ).filter(
+            Product.id.in_(product_ids),
+            Product.manufacturer_id.isnot(None)
+        ).group_by(Product.manufacturer_id).statement)
+    if not selects:
+        return None
+    return (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+
+def search_product_partners(roles, term, sort='relevance', limit=20, offset=0, exclude_user_id=None):
+    """Partners of the given roles that stock or make products matching a name or SKU.
+
+    Products are matched with the ranked product search and only the best
+    PARTNER_SEARCH_PRODUCT_LIMIT of them are looked up, so the cost does not
+    grow with the catalog. 'relevance' ranks partners offering the most
+    matching products first, then the cheapest.
+
+    Returns (user, offer) pairs of the requested page and whether more follow.
+    """
+    matched, rank = match_products(term)
+    product_ids = matched.with_entities(Product.id).order_by(*rank)\
+        .limit(current_app.config['PARTNER_SEARCH_PRODUCT_LIMIT']).subquery()
+    offers = product_offers(roles, db.session.query(product_ids.c.id))
+    if offers is None:
+        return [], False
+
+    price, stock = offers.c.lowest_price, offers.c.total_stock
+    order_by = {
+        'relevance': (offers.c.matched_products.desc(), price.asc().nullslast()),
+        'price': (price.asc().nullslast(),),
+        '-price': (price.desc().nullslast(),),
+        'stock': (stock.asc().nullslast(),),
+        '-stock': (stock.desc().nullslast(),)
+    }[sort] + (User.id,)
+
+    query = db.session.query(User, offers).join(offers, offers.c.partner_id == User.id)\
+        .filter(User.role.in_(roles), User.is_active == True)
+    if exclude_user_id:
+        query = query.filter(User.id != exclude_user_id)
+    rows = query.order_by(*order_by).offset(offset).limit(limit + 1).all()
+    return [(row[0], row[1:]) for row in rows[:limit]], len(rows) > limit
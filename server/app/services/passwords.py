@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a hash waited too long"""
+
+class HashingPool:
+    """Dedicated threads for password hashing with a bounded queue.
+
+    At most workers hashes run at once, so a burst of logins uses a fixed
+    share of CPU (PBKDF2 and scrypt release the GIL) and request threads
+    keep serving cheap endpoints. Up to max_queue more wait; beyond that,
+    or after timeout seconds of waiting, callers get HashingBusy at once
+    instead of piling up.
+    """
+
+    def __init__(self, workers, max_queue, timeout):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.timeout = timeout
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        # The slot is held until the hash finishes, even if the caller stops waiting
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingBusy()
+
+_pool = None
+_pool_lock = threading.Lock()
+_hash_prefixes = {}
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = current_app.config
+                _pool = HashingPool(
+                    config['PASSWORD_HASH_WORKERS'],
+                    config['PASSWORD_HASH_MAX_QUEUE'],
+                    config['PASSWORD_HASH_TIMEOUT']
+                )
+    return _pool
+
+def hash_method():
+    return current_app.config['PASSWORD_HASH_METHOD']
+
+def hash_password(password):
+    """Hash with the configured method on the hashing pool"""
+    return get_pool().run(generate_password_hash, password, hash_method())
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash on the hashing pool"""
+    if not password_hash:
+        return False
+    return get_pool().run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with other parameters than the configured method.
+
+    A short method such as 'pbkdf2' is compared by the full parameters
+    werkzeug expands it to, e.g. 'pbkdf2:sha256:600000'.
+    """
+    method = hash_method()
+    prefix = _hash_prefixes.get(method)
+    if prefix is None:
+        prefix = _hash_prefixes[method] = generate_password_hash('', method, salt_length=1).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != prefix
@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from marshmallow import ValidationError, EXCLUDE
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Category, Product
+from app.services import analytics
+from app.utils.validators import ProductSchema
+
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson'
+}
+
+def text_stream(binary_stream):
+    """Decode a binary stream lazily as UTF-8 text"""
+    return io.TextIOWrapper(io.BufferedReader(binary_stream), encoding='utf-8', newline='')
+
+def read_csv(stream):
+    """Yield (row_number, record) from CSV with a header row; empty cells become None"""
+    for row_number, row in enumerate(csv.DictReader(stream), start=1):
+        yield row_number, {key: (value if value != '' else None) for key, value in row.items() if key}
+
+def read_ndjson(stream):
+    """Yield (row_number, record) from NDJSON, one object per line"""
+    row_number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row_number, None
+            continue
+        yield row_number, record if isinstance(record, dict) else None
+
+def read_records(stream, fmt):
+    return read_csv(stream) if fmt == 'csv' else read_ndjson(stream)
+
+class ImportReport:
+    """Counts and per-row errors of one import, capped at max_errors entries"""
+
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, row_number, sku, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'sku': sku, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errorsTruncated': self.failed > len(self.errors)
+        }
+
+def import_products(records, manufacturer_id, upsert=False, batch_size=1000, max_errors=1000):
+    """Validate and load product records in batches.
+
+    Each batch is written with one multi-row INSERT ... ON CONFLICT (sku)
+    and committed on its own, so memory stays bounded by batch_size. In
+    upsert mode, conflicting SKUs owned by the same manufacturer are
+    updated; otherwise every conflict is reported as a row error. A SKU
+    repeated anywhere in the upload, an unknown category, or a batch the
+    database rejects is reported per row; batches already committed stay.
+    """
+    schema = ProductSchema(unknown=EXCLUDE)
+    report = ImportReport(max_errors)
+    batch = {}
+    seen_skus = set()
+
+    for row_number, record in records:
+        if record is None:
+            report.fail(row_number, None, {'_row': ['Malformed record']})
+            continue
+        try:
+            data = schema.load(record)
+        except ValidationError as e:
+            report.fail(row_number, record.get('sku'), e.messages)
+            continue
+
+        if data['sku'] in seen_skus:
+            report.fail(row_number, data['sku'], {'sku': ['Duplicate SKU in upload']})
+            continue
+
+        seen_skus.add(data['sku'])
+        batch[data['sku']] = (row_number, data)
+        if len(batch) >= batch_size:
+            _write_batch(batch, manufacturer_id, upsert, report)
+            batch = {}
+
+    if batch:
+        _write_batch(batch, manufacturer_id, upsert, report)
+
+    return report
+
+def _unknown_categories(batch):
+    """Category ids referenced by a batch that do not exist, found with one IN query"""
+    category_ids = {data['categoryId'] for _, data in batch.values() if data.get('categoryId')}
+    if not category_ids:
+        return set()
+    known = {category_id for (category_id,) in
+             db.session.query(Category.id).filter(Category.id.in_(category_ids))}
+    return category_ids - known
+
+def _write_batch(batch, manufacturer_id, upsert, report):
+    unknown = _unknown_categories(batch)
+    if unknown:
+        for sku, (row_number, data) in list(batch.items()):
+            if data.get('categoryId') in unknown:
+                report.fail(row_number, sku, {'categoryId': ['Category not found']})
+                del batch[sku]
+        if not batch:
+            return
+
+    now = datetime.utcnow()
+    rows = [{
+        'id': uuid.uuid4(),
+        'name': data['name'],
+        'description': data.get('description'),
+        'sku': sku,
+        'category_id': data.get('categoryId'),
+        'manufacturer_id': manufacturer_id,
+        'image_url': data.get('imageUrl'),
+        'base_price': data.get('basePrice'),
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now
+    } for sku, (_, data) in batch.items()]
+
+    table = Product.__table__
+    stmt = insert(table).values(rows)
+    if upsert:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sku],
+            set_={
+                'name': stmt.excluded.name,
+                'description': stmt.excluded.description,
+                'category_id': stmt.excluded.category_id,
+                'image_url': stmt.excluded.image_url,
+                'base_price': stmt.excluded.base_price,
+                'is_active': True,
+                'updated_at': now
+            },
+            where=table.c.manufacturer_id == stmt.excluded.manufacturer_id
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.sku])
+
+    try:
+        # created_at is still "now" only for rows this statement inserted
+        written = db.session.execute(stmt.returning(table.c.sku, table.c.created_at == now)).all()
+        inserted = sum(1 for _, was_inserted in written if was_inserted)
+        analytics.record_products_created(manufacturer_id, inserted)
+        db.session.commit()
+    except IntegrityError as e:
+        # e.g. a category deleted since it was checked; earlier batches stay committed
+        db.session.rollback()
+        for sku, (row_number, _) in batch.items():
+            report.fail(row_number, sku, {'_row': [f'Batch rejected: {e.orig}']})
+        return
+
+    report.inserted += inserted
+    report.updated += len(written) - inserted
+
+    written_skus = {sku for sku, _ in written}
+    for sku, (row_number, _) in batch.items():
+        if sku not in written_skus:
+            report.fail(row_number, sku, {'sku': ['Product with this SKU already exists']})
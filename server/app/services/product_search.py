@@ -0,0 +1,165 @@
+import re
+from flask import current_app
+from sqlalchemy import func, or_, and_, cast, true, Numeric
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from app import db
+from app.models import Product
+
+TEXT_SEARCH_CONFIG = 'simple'
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+def build_prefix_tsquery(term):
+    """Turn free text into a prefix tsquery ('gam lap' -> 'gam:* & lap:*').
+
+    Only word characters are kept, so user input can never produce tsquery
+    syntax errors. Returns None when the term has no searchable tokens.
+    """
+    tokens = TOKEN_PATTERN.findall(term.lower())
+    if not tokens:
+        return None
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+def escape_like(term):
+    """Escape LIKE wildcards in user input"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def filter_products(query, category_ids=None, manufacturer_ids=None, min_price=None, max_price=None):
+    """Restrict a product query to active products matching the given filters.
+
+    Each filter is served by its own index: category and manufacturer by
+    the foreign key indexes, the price range by idx_products_base_price.
+    """
+    query = query.filter(Product.is_active == True)
+    if category_ids:
+        query = query.filter(Product.category_id.in_(category_ids))
+    if manufacturer_ids:
+        query = query.filter(Product.manufacturer_id.in_(manufacturer_ids))
+    if min_price is not None:
+        query = query.filter(Product.base_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.base_price <= max_price)
+    return query
+
+def match_products(term, filters=None):
+    """Query of products matching a search term, and the order to rank them by.
+
+    An exact SKU hit (unique index) short-circuits to that single product.
+    Otherwise the generated search_vector is matched with a prefix tsquery
+    (GIN index), with trigram similarity on name and substring match on SKU
+    (pg_trgm GIN indexes) as fallbacks for typos and partial codes.
+    """
+    query = filter_products(Product.query, **(filters or {}))
+    term = term.strip()
+
+    if not term:
+        return query, (Product.created_at.desc(), Product.id.desc())
+
+    exact = query.filter(Product.sku == term).with_entities(Product.id).first()
+    if exact:
+        return query.filter(Product.id == exact.id), (Product.id,)
+
+    tsquery_text = build_prefix_tsquery(term)
+    conditions = [
+        Product.name.op('%')(term),
+        Product.sku.ilike(f'%{escape_like(term)}%', escape='\\')
+    ]
+    rank = func.similarity(Product.name, term)
+
+    if tsquery_text:
+        tsquery = func.to_tsquery(TEXT_SEARCH_CONFIG, tsquery_text)
+        conditions.append(Product.search_vector.op('@@')(tsquery))
+        rank = rank + func.ts_rank_cd(Product.search_vector, tsquery)
+
+    return query.filter(or_(*conditions)), (rank.desc(), Product.id)
+
+def search_products(term, filters=None, limit=20, offset=0):
+    """Ranked product search.
+
+    Returns the products of the requested page and whether more follow.
+    """
+    query, order_by = match_products(term, filters)
+    products = query.order_by(*order_by).offset(offset).limit(limit + 1).all()
+    return products[:limit], len(products) > limit
+
+def facet_counts(term, filters=None):
+    """Counts per category, manufacturer and price band for a search.
+
+    Facets are disjunctive: each dimension is counted with every active
+    filter except its own, so with a category picked the other categories
+    still show what they would add. All three facets come from one
+    GROUPING SETS aggregate over the products matching the term, each
+    counting only the rows that pass the other dimensions' filters.
+    """
+    filters = filters or {}
+    bounds = current_app.config['PRODUCT_PRICE_BANDS']
+    query, _ = match_products(term)
+    band = func.width_bucket(Product.base_price, cast(array(bounds), ARRAY(Numeric)))
+
+    category_ids = filters.get('category_ids')
+    manufacturer_ids = filters.get('manufacturer_ids')
+    price_conditions = []
+    if filters.get('min_price') is not None:
+        price_conditions.append(Product.base_price >= filters['min_price'])
+    if filters.get('max_price') is not None:
+        price_conditions.append(Product.base_price <= filters['max_price'])
+
+    matched = query.with_entities(
+        Product.category_id.label('category_id'),
+        Product.manufacturer_id.label('manufacturer_id'),
+        band.label('price_band'),
+        (Product.category_id.in_(category_ids) if category_ids else true()).label('in_category'),
+        (Product.manufacturer_id.in_(manufacturer_ids) if manufacturer_ids else true()).label('in_manufacturer'),
+        (and_(*price_conditions) if price_conditions else true()).label('in_price')
+    ).subquery()
+
+    rows = db.session.query(
+        matched.c.category_id,
+        matched.c.manufacturer_id,
+        matched.c.price_band,
+        func.grouping(matched.c.category_id),
+        func.grouping(matched.c.manufacturer_id),
+        func.count().filter(and_(matched.c.in_manufacturer, matched.c.in_price)),
+        func.count().filter(and_(matched.c.in_category, matched.c.in_price)),
+        func.count().filter(and_(matched.c.in_category, matched.c.in_manufacturer))
+    ).group_by(
+        func.grouping_sets(matched.c.category_id, matched.c.manufacturer_id, matched.c.price_band)
+    ).all()
+
+    facets = {'categories': [], 'manufacturers': [], 'priceBands': []}
+    for (category_id, manufacturer_id, bucket, other_than_category, other_than_manufacturer,
+         category_count, manufacturer_count, band_count) in rows:
+        # grouping() is 1 for the columns a row was not grouped by
+        if not other_than_category:
+            if category_count:
+                facets['categories'].append({'id': str(category_id) if category_id else None, 'count': category_count})
+        elif not other_than_manufacturer:
+            if manufacturer_count:
+                facets['manufacturers'].append({'id': str(manufacturer_id) if manufacturer_id else None, 'count': manufacturer_count})
+        elif band_count:
+            facets['priceBands'].append(dict(price_band(bucket, bounds), count=band_count))
+
+    for values in facets.values():
+        values.sort(key=lambda facet: facet['count'], reverse=True)
+    return facets
+
+def price_band(bucket, bounds):
+    """Price range of a width_bucket() result; both ends are None for unpriced products"""
+    if bucket is None:
+        return {'min': None, 'max': None}
+    return {
+        'min': bounds[bucket - 1] if bucket > 0 else None,
+        'max': bounds[bucket] if bucket < len(bounds) else None
+    }
+
+def legacy_search_products(term, category_id=None):
+    """Unindexed ILIKE search that search_products replaced, kept for benchmarking"""
+    query = filter_products(Product.query, [category_id] if category_id else None)
+    if term:
+        query = query.filter(
+            or_(
+                Product.name.ilike(f'%{term}%'),
+                Product.description.ilike(f'%{term}%'),
+                Product.sku.ilike(f'%{term}%')
+            )
+        )
+    return query.all()
@@ -0,0 +1,264 @@
+import atexit
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DataError, IntegrityError
+from app import db
+from app.models import SearchHistory
+from app.services.suggest import normalize
+from app.utils.jobs import try_advisory_xact_lock, mark_refreshed, last_refreshed
+
+COMPACTION = 'search_history_compaction'
+COMPACTION_LOCK = 0x53484350
+COMPACTION_CHECK_SECONDS = 600
+
+# Same normalization as suggest.normalize: lowercase, collapsed whitespace
+TERM_KEY = "lower(regexp_replace(btrim(search_term), '\\s+', ' ', 'g'))"
+
+class SearchHistoryBuffer:
+    """Write-behind buffer for search history rows.
+
+    record() only appends to memory; a flusher thread writes the pending
+    rows with one multi-row INSERT once batch_size rows are waiting or
+    every flush_interval seconds. A search repeating the same user's
+    previous term is collapsed into that row while it is still pending;
+    once written, a repeat starts a new row. Rows the database rejects
+    are logged and dropped, never queued again. Rows still pending when
+    the process exits normally are flushed by an atexit hook; a crash
+    loses at most one interval of searches.
+    """
+
+    def __init__(self, app, batch_size, flush_interval, max_pending, dedup_users):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dedup_users = dedup_users
+        self.pending = []
+        # user_id -> (search key, row); the row may already be flushed
+        self.last_search = OrderedDict()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, user_id, search_term, search_type, result_count):
+        """Queue one search and return its row; repeats of the user's last search update it"""
+        key = (search_type, normalize(search_term))
+        now = datetime.utcnow()
+        with self.lock:
+            last = self.last_search.get(user_id)
+            # Only a row that is still pending can be changed
+            if last and last[0] == key and last[1]['pending']:
+                self.last_search.move_to_end(user_id)
+                row = last[1]
+                row['result_count'] = result_count
+                row['search_count'] += 1
+                row['created_at'] = now
+                return row
+
+            row = {
+                'id': uuid.uuid4(),
+                'user_id': uuid.UUID(str(user_id)),
+                'search_term': search_term,
+                'search_type': search_type,
+                'result_count': result_count,
+                'search_count': 1,
+                'created_at': now,
+                'pending': True
+            }
+            self.pending.append(row)
+            self.last_search[user_id] = (key, row)
+            self.last_search.move_to_end(user_id)
+            if len(self.last_search) > self.dedup_users:
+                self.last_search.popitem(last=False)
+            if len(self.pending) >= self.batch_size:
+                self.wake.set()
+        return row
+
+    def pending_for(self, user_id):
+        """Rows of a user that are not written yet, so reads can include them"""
+        user_id = uuid.UUID(str(user_id))
+        with self.lock:
+            return [row for row in self.pending if row['user_id'] == user_id]
+
+    def flush(self):
+        """Write every pending row; rows of a write that failed for want of a database are kept for the next attempt"""
+        with self.flush_lock:
+            with self.lock:
+                rows, self.pending = self.pending, []
+                for row in rows:
+                    row['pending'] = False
+            if not rows:
+                return 0
+
+            with self.app.app_context():
+                try:
+                    return self._write(rows)
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f'Search history flush of {len(rows)} rows failed: {e}')
+
+            with self.lock:
+                for row in rows:
+                    row['pending'] = True
+                waiting = rows + self.pending
+                self.pending = waiting[-self.max_pending:]
+            if len(waiting) > self.max_pending:
+                self.app.logger.warning(f'Dropped {len(waiting) - self.max_pending} search history rows over the pending limit')
+            return 0
+
+    def _write(self, rows):
+        """Insert rows in one statement, or one at a time when a bad row fails the statement"""
+        try:
+            db.session.execute(insert(SearchHistory), [columns(row) for row in rows])
+            db.session.commit()
+            return len(rows)
+        except (DataError, IntegrityError) as e:
+            db.session.rollback()
+            self.app.logger.warning(f'Search history batch of {len(rows)} rows rejected, writing rows one by one: {e}')
+
+        written = 0
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(SearchHistory), [columns(row)])
+                written += 1
+            except (DataError, IntegrityError) as e:
+                # e.g. the user was deleted meanwhile; retrying cannot help
+                self.app.logger.warning(f"Dropped search history row of user {row['user_id']}: {e}")
+        db.session.commit()
+        return written
+
+    def _run(self):
+        while not self.stopped:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flusher and write what is left"""
+        self.stopped = True
+        self.wake.set()
+        self.thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_buffer():
+    """The process's buffer, started on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = current_app.config
+                _buffer = SearchHistoryBuffer(
+                    current_app._get_current_object(),
+                    batch_size=config['SEARCH_HISTORY_BATCH_SIZE'],
+                    flush_interval=config['SEARCH_HISTORY_FLUSH_MS'] / 1000,
+                    max_pending=config['SEARCH_HISTORY_MAX_PENDING'],
+                    dedup_users=config['SEARCH_HISTORY_DEDUP_USERS']
+                )
+    return _buffer
+
+def is_buffered():
+    return current_app.config['SEARCH_HISTORY_DURABILITY'] == 'buffered'
+
+def columns(row):
+    """Column values of a buffered row, without its bookkeeping flag"""
+    return {column: value for column, value in row.items() if column != 'pending'}
+
+def row_to_dict(row):
+    return SearchHistory(**columns(row)).to_dict()
+
+def compact_search_history(retention_days, max_per_user):
+    """Bound search_history: expire, merge repeats, and cap rows per user.
+
+    In one transaction:
+    - rows older than the retention window are deleted
+    - repeats of a term by the same user (same normalization as typeahead)
+      are merged into the latest row, whose search_count becomes the total
+      and whose created_at is thus the last time the term was searched
+    - each user keeps only their max_per_user most recent rows
+
+    Returns the rows removed by each step, or None when another worker is
+    already compacting.
+    """
+    if not try_advisory_xact_lock(COMPACTION_LOCK):
+        db.session.rollback()
+        return None
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    expired = db.session.execute(
+        text("DELETE FROM search_history WHERE created_at < :cutoff"),
+        {'cutoff': cutoff}
+    ).rowcount
+
+    merged = db.session.execute(text(f"""
+        WITH ranked AS (
+            SELECT id,
+                   row_number() OVER w AS position,
+                   sum(search_count) OVER (PARTITION BY user_id, search_type, {TERM_KEY}) AS total
+            FROM search_history
+            WINDOW w AS (PARTITION BY user_id, search_type, {TERM_KEY} ORDER BY created_at DESC, id DESC)
+        ),
+        kept AS (
+            UPDATE search_history
+            SET search_count = ranked.total
+            FROM ranked
+            WHERE search_history.id = ranked.id
+              AND ranked.position = 1
+              AND search_history.search_count <> ranked.total
+        )
+        DELETE FROM search_history
+        USING ranked
+        WHERE search_history.id = ranked.id AND ranked.position > 1
+    """)).rowcount
+
+    trimmed = db.session.execute(text("""
+        DELETE FROM search_history
+        USING (
+            SELECT id, row_number() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS position
+            FROM search_history
+        ) ranked
+        WHERE search_history.id = ranked.id AND ranked.position > :max_per_user
+    """), {'max_per_user': max_per_user}).rowcount
+
+    mark_refreshed(COMPACTION)
+    db.session.commit()
+    return {'expired': expired, 'merged': merged, 'trimmed': trimmed}
+
+def _run_compaction_schedule(app):
+    interval = app.config['SEARCH_HISTORY_COMPACT_SECONDS']
+    while True:
+        time.sleep(min(interval, COMPACTION_CHECK_SECONDS))
+        try:
+            with app.app_context():
+                compacted_at = last_refreshed(COMPACTION)
+                if compacted_at is None or (datetime.utcnow() - compacted_at).total_seconds() >= interval:
+                    result = compact_search_history(
+                        app.config['SEARCH_HISTORY_RETENTION_DAYS'],
+                        app.config['SEARCH_HISTORY_MAX_PER_USER']
+                    )
+                    if result:
+                        app.logger.info(f'Search history compacted: {result}')
+        except Exception as e:
+            app.logger.error(f'Search history compaction failed: {e}')
+
+def schedule_compaction(app):
+    """Compact search history every SEARCH_HISTORY_COMPACT_SECONDS from a background thread.
+
+    Started from jobs.start_when_serving, so every serving process runs the
+    schedule but CLI commands do not; the job's last run is stored in the
+    database and an advisory lock lets a single worker do each run.
+    """
+    if app.config['SEARCH_HISTORY_COMPACT_SECONDS'] > 0:
+        threading.Thread(target=_run_compaction_schedule, args=(app,), daemon=True).start()
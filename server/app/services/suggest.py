@@ -0,0 +1,219 @@
+import bisect
+import heapq
+import random
+import threading
+import time
+from operator import itemgetter
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Product, Category, SearchHistory
+
+KEY_SENTINEL = '\U0010ffff'
+weight_of = itemgetter(0)
+
+def normalize(text):
+    """Lowercase and collapse whitespace"""
+    return ' '.join(text.lower().split())
+
+class PrefixIndex:
+    """Sorted-array prefix index with precomputed top-k lists for dense prefixes.
+
+    keys is kept sorted and entries is aligned with it; an entry is a
+    (weight, type, id, text) tuple. Every prefix that matches more than
+    scan_limit keys has its best top_k entries stored in heavy, so a lookup
+    either reads a stored list or ranks at most scan_limit entries.
+    """
+
+    def __init__(self, top_k=10, scan_limit=2000):
+        self.top_k = top_k
+        self.scan_limit = scan_limit
+        self.keys = []
+        self.entries = []
+        self.heavy = {}
+        self.lock = threading.Lock()
+
+    def build(self, items):
+        """Build from an iterable of (text, entry) pairs"""
+        pairs = sorted(((normalize(text), entry) for text, entry in items if text), key=itemgetter(0))
+        with self.lock:
+            self.keys = [key for key, _ in pairs]
+            self.entries = [entry for _, entry in pairs]
+            self.heavy = {}
+            if self.keys:
+                self._collect(0, len(self.keys), 0)
+
+    def _collect(self, lo, hi, depth):
+        """Top entries of keys[lo:hi], which share a prefix of length depth.
+
+        Dense ranges are split on the next character and the result of each
+        split is stored in heavy under its prefix.
+        """
+        if hi - lo <= self.scan_limit:
+            return heapq.nlargest(self.top_k, self.entries[lo:hi], key=weight_of)
+
+        candidates = []
+        i = lo
+        while i < hi:
+            key = self.keys[i]
+            if len(key) == depth:
+                j = bisect.bisect_right(self.keys, key, i, hi)
+                candidates.extend(heapq.nlargest(self.top_k, self.entries[i:j], key=weight_of))
+            else:
+                j = bisect.bisect_left(self.keys, key[:depth + 1] + KEY_SENTINEL, i, hi)
+                candidates.extend(self._collect(i, j, depth + 1))
+            i = j
+
+        top = heapq.nlargest(self.top_k, candidates, key=weight_of)
+        self.heavy[self.keys[lo][:depth]] = top
+        return top
+
+    def add(self, text, entry):
+        """Insert one key, keeping stored top-k lists of its prefixes current"""
+        key = normalize(text)
+        if not key:
+            return
+        with self.lock:
+            i = bisect.bisect_right(self.keys, key)
+            self.keys.insert(i, key)
+            self.entries.insert(i, entry)
+            for n in range(len(key) + 1):
+                top = self.heavy.get(key[:n])
+                if top is not None:
+                    # A new list: search() hands out the stored one after releasing the lock
+                    self.heavy[key[:n]] = heapq.nlargest(self.top_k, top + [entry], key=weight_of)
+
+    def search(self, prefix, limit):
+        """Best entries whose key starts with prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self.lock:
+            top = self.heavy.get(prefix)
+            if top is None:
+                lo = bisect.bisect_left(self.keys, prefix)
+                hi = bisect.bisect_left(self.keys, prefix + KEY_SENTINEL, lo)
+                if hi - lo > self.scan_limit:
+                    # Grew dense through incremental inserts since the last build
+                    top = self._collect(lo, hi, len(prefix))
+                else:
+                    top = heapq.nlargest(self.top_k, self.entries[lo:hi], key=weight_of)
+        return top[:limit]
+
+    def __len__(self):
+        return len(self.keys)
+
+_index = None
+_refresh_at = 0.0
+_build_lock = threading.Lock()
+_refreshing = False
+
+def load_popularity():
+    """Product search counts per normalized term from SearchHistory"""
+    term = func.lower(SearchHistory.search_term)
+    rows = db.session.query(term, func.sum(SearchHistory.search_count))\
+        .filter(SearchHistory.search_type == 'product')\
+        .group_by(term)\
+        .all()
+    popularity = {}
+    for search_term, count in rows:
+        key = normalize(search_term)
+        popularity[key] = popularity.get(key, 0) + count
+    return popularity
+
+def product_entries(product_id, name, sku, popularity):
+    """Index items for one product: its name and its SKU"""
+    product_id = str(product_id)
+    yield name, (popularity.get(normalize(name), 0), 'product', product_id, name)
+    yield sku, (popularity.get(normalize(sku), 0), 'sku', product_id, sku)
+
+def load_items(popularity):
+    """Stream index items for every active product and every category"""
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+    products = db.session.query(Product.id, Product.name, Product.sku)\
+        .filter(Product.is_active == True)\
+        .yield_per(batch_size)
+    for product_id, name, sku in products:
+        yield from product_entries(product_id, name, sku, popularity)
+
+    for category_id, name in db.session.query(Category.id, Category.name):
+        yield name, (popularity.get(normalize(name), 0), 'category', str(category_id), name)
+
+def build_index():
+    """Build a fresh index from the database and swap it in"""
+    global _index, _refresh_at
+    config = current_app.config
+    index = PrefixIndex(top_k=config['SUGGEST_TOP_K'], scan_limit=config['SUGGEST_SCAN_LIMIT'])
+    index.build(load_items(load_popularity()))
+    refresh_seconds = config['SUGGEST_REFRESH_SECONDS'] * (1 + random.uniform(0, config['SUGGEST_REFRESH_JITTER']))
+    _index, _refresh_at = index, time.monotonic() + refresh_seconds
+    current_app.logger.info(f'Suggest index built with {len(index)} keys')
+    return index
+
+def _refresh_in_background(app):
+    global _refreshing
+    try:
+        with app.app_context():
+            build_index()
+    except Exception as e:
+        app.logger.error(f'Suggest index refresh failed: {e}')
+    finally:
+        _refreshing = False
+
+def get_index():
+    """Current index; built on first use and rebuilt in the background once stale.
+
+    Each worker process holds its own index, so the periodic rebuild is what
+    picks up products created through other workers. Rebuilds are spread by
+    a random delay, so workers started together do not all rebuild, and
+    hold the GIL, at the same moment.
+    """
+    global _refreshing
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                build_index()
+    elif not _refreshing and time.monotonic() > _refresh_at:
+        with _build_lock:
+            if not _refreshing:
+                _refreshing = True
+                app = current_app._get_current_object()
+                threading.Thread(target=_refresh_in_background, args=(app,), daemon=True).start()
+    return _index
+
+def _warm(app):
+    with app.app_context():
+        try:
+            with _build_lock:
+                if _index is None:
+                    build_index()
+        except Exception as e:
+            app.logger.warning(f'Suggest index not built at startup, will build on first use: {e}')
+
+def warm_suggest_index(app):
+    """Build the index in the background, so the first lookup usually finds it ready.
+
+    Meant for serving processes, via jobs.start_when_serving; a lookup
+    arriving before the build finishes waits for it instead of building
+    a second index.
+    """
+    threading.Thread(target=_warm, args=(app,), daemon=True).start()
+
+def mark_stale():
+    """Have the next lookup trigger a background rebuild, e.g. after a bulk import"""
+    global _refresh_at
+    _refresh_at = 0.0
+
+def add_product(product):
+    """Add a newly created product to this process's index"""
+    if _index is None or not product.is_active:
+        return
+    for text, entry in product_entries(product.id, product.name, product.sku, {}):
+        _index.add(text, entry)
+
+def suggest(prefix, limit):
+    """Suggestions for a typed prefix, most popular first"""
+    return [
+        {'type': kind, 'id': ref_id, 'text': text}
+        for _, kind, ref_id, text in get_index().search(prefix, limit)
+    ]
@@ -0,0 +1,121 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models import RevokedToken
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings.
+
+    Sized for capacity items at the given false positive rate; a miss is
+    certain, a hit only probable. Positions come from one blake2b digest
+    split into two 64-bit halves (double hashing).
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.lock = threading.Lock()
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        with self.lock:
+            for position in self._positions(item):
+                self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, item):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
+
+_filter = None
+_filter_built_at = 0
+_filter_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_revoked_since_build = []
+
+def _build_filter():
+    """Fill a new filter with every refresh token revoked and not yet expired, and swap it in.
+
+    Tokens this process revoked since the last build are added as well: a
+    revocation whose transaction had not committed when the rows were read
+    must not go missing from the new filter. Caller holds _rebuild_lock.
+    """
+    global _filter, _filter_built_at
+    config = current_app.config
+    bloom = BloomFilter(config['REVOKED_TOKENS_BLOOM_CAPACITY'], config['REVOKED_TOKENS_BLOOM_ERROR_RATE'])
+    rows = db.session.query(RevokedToken.jti)\
+        .filter(RevokedToken.expires_at > datetime.utcnow())\
+        .yield_per(config['STREAM_BATCH_SIZE'])
+    for (jti,) in rows:
+        bloom.add(jti)
+    with _filter_lock:
+        for jti in _revoked_since_build:
+            bloom.add(jti)
+        _revoked_since_build.clear()
+        _filter = bloom
+        _filter_built_at = time.monotonic()
+
+def get_filter():
+    """This process's filter, rebuilt every REVOKED_TOKENS_BLOOM_REBUILD_SECONDS.
+
+    Bits are never cleared, so without rebuilds expired and pruned
+    revocations would pile up until every check is a false positive.
+    """
+    if _filter is None:
+        with _rebuild_lock:
+            if _filter is None:
+                _build_filter()
+    elif time.monotonic() - _filter_built_at > current_app.config['REVOKED_TOKENS_BLOOM_REBUILD_SECONDS']:
+        # One thread rebuilds; the others keep checking against the current filter
+        if _rebuild_lock.acquire(blocking=False):
+            try:
+                _build_filter()
+            finally:
+                _rebuild_lock.release()
+    return _filter
+
+def is_revoked(jti):
+    """Whether a refresh token was revoked.
+
+    The filter answers most checks without a query; its hits, which may be
+    false positives, are confirmed in revoked_tokens. Revocations made by
+    other processes are not in this filter, which is why rotation itself
+    relies on revoke() rather than on this check.
+    """
+    if jti not in get_filter():
+        return False
+    return db.session.get(RevokedToken, jti) is not None
+
+def revoke(jti, user_id, expires_at):
+    """Revoke a refresh token in the caller's transaction.
+
+    One INSERT ... ON CONFLICT DO NOTHING: returns False when the token was
+    already revoked, so of two requests presenting the same token only one
+    can rotate it, whichever process serves them.
+    """
+    table = RevokedToken.__table__
+    stmt = insert(table).values(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=datetime.utcnow())
+    inserted = db.session.execute(
+        stmt.on_conflict_do_nothing(index_elements=[table.c.jti]).returning(table.c.jti)
+    ).first()
+    if inserted:
+        get_filter()
+        # Under the lock a rebuild swaps filters with, so the token lands in the new one
+        with _filter_lock:
+            _filter.add(jti)
+            _revoked_since_build.append(jti)
+    return inserted is not None
+
+def prune_revoked_tokens():
+    """Delete revocations of tokens that have expired anyway; returns how many"""
+    deleted = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,230 @@
+import heapq
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from operator import itemgetter
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models import TrendingCheckpoint
+from app.services.suggest import normalize
+
+SEARCH_TYPES = ('product', 'manufacturer', 'distributor')
+
+# window -> (bucket size, buckets per window)
+WINDOWS = {
+    'hour': (timedelta(minutes=5), 12),
+    'day': (timedelta(hours=1), 24)
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+class SpaceSaving:
+    """Space-Saving heavy hitters summary holding at most capacity counters.
+
+    counters maps a term to [count, error]; count overestimates the true
+    frequency by at most error. heap holds one (count, term) entry per term,
+    possibly with an outdated count, so the minimum to evict is found by
+    popping and re-pushing outdated entries.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}
+        self.heap = []
+
+    def add(self, term, count=1):
+        counter = self.counters.get(term)
+        if counter is not None:
+            counter[0] += count
+            return
+
+        error = 0
+        if len(self.counters) >= self.capacity:
+            while True:
+                min_count, min_term = heapq.heappop(self.heap)
+                current = self.counters[min_term][0]
+                if current == min_count:
+                    break
+                heapq.heappush(self.heap, (current, min_term))
+            del self.counters[min_term]
+            error = min_count
+
+        self.counters[term] = [error + count, error]
+        heapq.heappush(self.heap, (error + count, term))
+
+    def items(self):
+        return [(term, count, error) for term, (count, error) in self.counters.items()]
+
+_boot = None
+
+def worker_id():
+    """Id of this process, unique across restarts.
+
+    hostname:pid repeats when a container restarts, so a random part is
+    added per process; it is drawn again after a fork, since workers forked
+    from a preloaded app inherit the parent's.
+    """
+    global _boot
+    pid = os.getpid()
+    if _boot is None or _boot[0] != pid:
+        _boot = (pid, f'{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:12]}')
+    return _boot[1]
+
+def bucket_start(now, size):
+    """Start of the fixed-size bucket containing now"""
+    return now - (now - EPOCH) % size
+
+def merge_top(item_lists, limit):
+    """Top terms of several summaries by their summed counts"""
+    totals = {}
+    for items in item_lists:
+        for term, count, _ in items:
+            totals[term] = totals.get(term, 0) + count
+    top = heapq.nlargest(limit, totals.items(), key=itemgetter(1))
+    return [{'term': term, 'count': count} for term, count in top]
+
+class TrendingTracker:
+    """Space-Saving summaries per search type, window and time bucket of this process"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def record(self, search_type, term, now):
+        with self.lock:
+            for window, (size, _) in WINDOWS.items():
+                key = (search_type, window, bucket_start(now, size))
+                summary = self.buckets.get(key)
+                if summary is None:
+                    summary = self.buckets[key] = SpaceSaving(self.capacity)
+                summary.add(term)
+
+    def expire(self, now):
+        """Drop buckets that have left their window"""
+        with self.lock:
+            for key in [key for key in self.buckets if key[2] < window_start(key[1], now)]:
+                del self.buckets[key]
+
+    def live_items(self, search_type, window, now):
+        cutoff = window_start(window, now)
+        with self.lock:
+            return [
+                summary.items()
+                for (kind, bucket_window, start), summary in self.buckets.items()
+                if kind == search_type and bucket_window == window and start >= cutoff
+            ]
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                {'search_type': kind, 'period': window, 'bucket_start': start, 'counters': summary.items()}
+                for (kind, window, start), summary in self.buckets.items()
+            ]
+
+def window_start(window, now):
+    """Start of the oldest bucket still inside the window"""
+    size, count = WINDOWS[window]
+    return bucket_start(now, size) - size * (count - 1)
+
+_tracker = None
+_tracker_lock = threading.Lock()
+_checkpointed_at = time.monotonic()
+_checkpointing = False
+_remote = {}
+
+def get_tracker():
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = TrendingTracker(current_app.config['TRENDING_CAPACITY'])
+    return _tracker
+
+def checkpoint():
+    """Persist this process's live buckets and delete buckets every window has left.
+
+    Rows are keyed by worker, so processes never overwrite each other's
+    counts, and the counts of a restarted worker remain readable until their
+    buckets expire.
+    """
+    global _checkpointed_at
+    tracker = get_tracker()
+    now = datetime.utcnow()
+    tracker.expire(now)
+    rows = tracker.snapshot()
+
+    table = TrendingCheckpoint.__table__
+    if rows:
+        stmt = insert(table).values([dict(row, worker=worker_id(), updated_at=now) for row in rows])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.worker, table.c.search_type, table.c.period, table.c.bucket_start],
+            set_={'counters': stmt.excluded.counters, 'updated_at': now}
+        ))
+    for window in WINDOWS:
+        db.session.execute(table.delete().where(
+            table.c.period == window,
+            table.c.bucket_start < window_start(window, now)
+        ))
+    db.session.commit()
+    _checkpointed_at = time.monotonic()
+
+def _checkpoint_in_background(app):
+    global _checkpointing
+    try:
+        with app.app_context():
+            checkpoint()
+    except Exception as e:
+        app.logger.error(f'Trending checkpoint failed: {e}')
+    finally:
+        _checkpointing = False
+
+def _maybe_checkpoint():
+    global _checkpointing
+    if _checkpointing or time.monotonic() - _checkpointed_at < current_app.config['TRENDING_CHECKPOINT_SECONDS']:
+        return
+    with _tracker_lock:
+        if not _checkpointing:
+            _checkpointing = True
+            app = current_app._get_current_object()
+            threading.Thread(target=_checkpoint_in_background, args=(app,), daemon=True).start()
+
+def record_search(search_type, term):
+    """Count one search in this process's trending summaries"""
+    term = normalize(term)
+    if term:
+        get_tracker().record(search_type, term, datetime.utcnow())
+        _maybe_checkpoint()
+
+def _remote_items(search_type, window, now):
+    """Checkpointed summaries of other workers in the window, cached between checkpoints"""
+    key = (search_type, window)
+    cached = _remote.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    rows = db.session.query(TrendingCheckpoint.counters).filter(
+        TrendingCheckpoint.search_type == search_type,
+        TrendingCheckpoint.period == window,
+        TrendingCheckpoint.bucket_start >= window_start(window, now),
+        TrendingCheckpoint.worker != worker_id()
+    ).all()
+    items = [counters for (counters,) in rows]
+    _remote[key] = (time.monotonic() + current_app.config['TRENDING_CHECKPOINT_SECONDS'], items)
+    return items
+
+def trending(search_type, window, limit):
+    """Most searched terms of a type in the last hour or day, across all workers.
+
+    Reads this process's live summaries and the other workers' checkpoints,
+    never search_history. Counts are Space-Saving estimates and may
+    overcount rare terms, not the leaders.
+    """
+    now = datetime.utcnow()
+    items = get_tracker().live_items(search_type, window, now) + _remote_items(search_type, window, now)
+    _maybe_checkpoint()
+    return merge_top(items, limit)
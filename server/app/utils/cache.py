@@ -0,0 +1,91 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+CachedPayload = namedtuple('CachedPayload', ['body', 'etag', 'next_cursor'], defaults=(None,))
+_Entry = namedtuple('_Entry', ['version', 'expires_at', 'payload'])
+
+class PayloadCache:
+    """Process-local LRU cache of pre-encoded JSON payloads.
+
+    Entries are tagged with the cache version current when they were built;
+    invalidate() bumps the version, which retires every entry at once. The
+    TTL bounds staleness for changes made by other processes.
+    """
+
+    def __init__(self, max_entries=1):
+        self.max_entries = max_entries
+        self.version = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+
+    def get(self, key, build, ttl, paginated=False):
+        """Cached payload for key, calling build() for the data on a miss.
+
+        With paginated, build() returns (items, next_cursor) and the cursor
+        is cached alongside the encoded items.
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry.version == self.version and entry.expires_at > now:
+                self.entries.move_to_end(key)
+                return entry.payload
+            version = self.version
+
+        data, next_cursor = build() if paginated else (build(), None)
+        body = current_app.json.dumps(data).encode()
+        payload = CachedPayload(body, hashlib.sha1(body).hexdigest(), next_cursor)
+
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = _Entry(version, now + ttl, payload)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return payload
+
+def on_commit(session, action):
+    """Call action once after the session's transaction commits; a rollback drops it.
+
+    For cache invalidation from mapper events, which run at flush: a
+    reader served between the flush and the commit would otherwise cache
+    the old rows again under the new version.
+    """
+    # A dict keeps the order and calls a repeated action once
+    session.info.setdefault('on_commit', {})[action] = None
+
+def _run_commit_actions(session):
+    # Releasing a savepoint also fires after_commit; its changes are not committed yet
+    if session.in_nested_transaction():
+        return
+    for action in session.info.pop('on_commit', {}):
+        action()
+
+def _drop_commit_actions(session, transaction):
+    # Runs after after_commit, so only actions of a rolled back or closed transaction are left;
+    # a savepoint ending leaves the outer transaction's changes to commit
+    if transaction.parent is None:
+        session.info.pop('on_commit', None)
+
+event.listen(Session, 'after_commit', _run_commit_actions)
+event.listen(Session, 'after_transaction_end', _drop_commit_actions)
+
+def payload_response(payload, max_age, private=False):
+    """JSON response with a strong ETag; answers 304 when If-None-Match matches"""
+    response = current_app.response_class(payload.body, mimetype='application/json')
+    response.set_etag(payload.etag)
+    if payload.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = payload.next_cursor
+    response.headers['Cache-Control'] = f'{"private" if private else "public"}, max-age={max_age}'
+    return response.make_conditional(request)
@@ -1,7 +1,6 @@
 from functools import wraps
 from flask import request, jsonify
-from flask_jwt_extended import get_jwt_identity
-from app.models import User
+from app.utils.identity import current_role
 
 def validate_json(f):
     """Decorator to validate JSON request"""
@@ -17,13 +16,8 @@ def role_required(required_role):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            
-            if not user:
-                return jsonify({'message': 'User not found'}), 404
-            
-            if user.role != required_role:
+            # The role claim of the token; no database access
+            if current_role() != required_role:
                 return jsonify({'message': f'Access denied. {required_role} role required'}), 403
             
             return f(*args, **kwargs)
@@ -35,13 +29,7 @@ def roles_required(required_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            
-            if not user:
-                return jsonify({'message': 'User not found'}), 404
-            
-            if user.role not in required_roles:
+            if current_role() not in required_roles:
                 return jsonify({'message': f'Access denied. {required_roles} role required'}), 403
             
             return f(*args, **kwargs)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from app import db
+from app.models import User
+from app.utils.cache import on_commit
+
+class UserCache:
+    """Process-local LRU of detached User copies, each kept for ttl seconds.
+
+    Copies are merged into the request's session without a query, so a
+    cached user behaves like one just loaded. Users changed through this
+    process are dropped at once; the TTL bounds how long a change made by
+    another process goes unseen.
+    """
+
+    def __init__(self, max_users, ttl):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.users = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self.users.move_to_end(user_id)
+                return entry[1]
+        return None
+
+    def put(self, user):
+        # Copy the loaded columns only; the cached object is never attached to a session
+        values = {key: value for key, value in db.inspect(user).dict.items() if key in User.__table__.c}
+        copy = User(**values)
+        make_transient_to_detached(copy)
+        with self.lock:
+            self.users[str(user.id)] = (time.monotonic() + self.ttl, copy)
+            self.users.move_to_end(str(user.id))
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.users.pop(str(user_id), None)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = current_app.config
+                _cache = UserCache(config['USER_CACHE_MAX_USERS'], config['USER_CACHE_TTL'])
+    return _cache
+
+def _bump_token_version(mapper, connection, target):
+    # A role change or deactivation retires every token issued before it
+    state = db.inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.is_active.history.has_changes():
+        target.token_version = (target.token_version or 0) + 1
+
+def _forget_user(mapper, connection, target):
+    # After commit, so a request in between cannot cache the old row again
+    if _cache is not None:
+        user_id = target.id
+        on_commit(object_session(target), lambda: _cache.discard(user_id))
+
+event.listen(User, 'before_update', _bump_token_version)
+event.listen(User, 'after_update', _forget_user)
+event.listen(User, 'after_delete', _forget_user)
+
+def token_claims(user):
+    """Claims added to a user's tokens so requests can be authorized without loading the user"""
+    return {'role': user.role, 'active': bool(user.is_active), 'ver': user.token_version or 0}
+
+def load_user(user_id):
+    """User by id for this request: at most one lookup per request, and none while cached"""
+    user_id = str(user_id)
+    users = g.setdefault('users', {})
+    if user_id not in users:
+        cached = get_cache().get(user_id)
+        if cached is not None:
+            users[user_id] = db.session.merge(cached, load=False)
+        else:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                get_cache().put(user)
+            users[user_id] = user
+    return users[user_id]
+
+def get_current_user():
+    """The authenticated user"""
+    return load_user(get_jwt_identity())
+
+def current_role():
+    """Role of the authenticated user, from the token when it carries one"""
+    role = get_jwt().get('role')
+    if role is None:
+        user = get_current_user()
+        role = user.role if user else None
+    return role
+
+def is_token_revoked(jwt_payload):
+    """Tokens of missing or inactive users, or issued before a role change or deactivation, are refused.
+
+    Tokens without a version claim count as version 0, the version of
+    users whose role and status never changed.
+    """
+    user = load_user(jwt_payload['sub'])
+    if user is None or not user.is_active:
+        return True
+    return jwt_payload.get('ver', 0) != (user.token_version or 0)
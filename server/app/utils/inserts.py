@@ -0,0 +1,32 @@
+from sqlalchemy import select, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User
+
+def insert_user_link(model, values, user_column, user_id, conflict_columns):
+    """Insert a row pointing at an existing user, unless a conflicting row exists, in one statement.
+
+    The row is inserted from a SELECT on users, so an unknown user inserts
+    nothing instead of failing on the foreign key. ON CONFLICT DO NOTHING
+    on the unique conflict_columns makes a repeated or concurrent insert a
+    no-op instead of a duplicate. The INSERT ... RETURNING runs in a CTE
+    joined back to users, so the new row and the user it points at come
+    back from the same round trip.
+
+    Returns (row, user), or None when nothing was inserted because the user
+    does not exist or the row already does.
+    """
+    table = model.__table__
+    source = select(
+        *(literal(value, table.c[name].type) for name, value in values.items()),
+        User.id
+    ).where(User.id == user_id)
+    stmt = insert(table).from_select([*values, user_column], source)\
+        .on_conflict_do_nothing(index_elements=[table.c[name] for name in conflict_columns])\
+        .returning(*table.c)
+    inserted = stmt.cte('inserted')
+    row = aliased(model, inserted)
+    return db.session.execute(
+        select(row, User).join(User, User.id == inserted.c[user_column])
+    ).first()
@@ -0,0 +1,44 @@
+import threading
+from datetime import datetime
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models import SummaryRefresh
+
+def try_advisory_xact_lock(key):
+    """Take a transaction-level advisory lock if free, so only one worker runs a job"""
+    return db.session.execute(select(func.pg_try_advisory_xact_lock(key))).scalar()
+
+def mark_refreshed(name):
+    """Record that a periodic job finished, in the caller's transaction"""
+    table = SummaryRefresh.__table__
+    stmt = insert(table).values(name=name, refreshed_at=datetime.utcnow())
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={'refreshed_at': stmt.excluded.refreshed_at}
+    ))
+
+def last_refreshed(name):
+    """When a periodic job last finished, or None"""
+    refresh = db.session.get(SummaryRefresh, name)
+    return refresh.refreshed_at if refresh else None
+
+def start_when_serving(app, *starters):
+    """Call each starter(app) once per process, when the process handles its first request.
+
+    Importing the app starts nothing, so flask CLI commands (which load
+    wsgi.py) and the dev reloader's watcher process never run background
+    jobs; each gunicorn worker starts its own after the fork.
+    """
+    lock = threading.Lock()
+    started = []
+
+    @app.before_request
+    def _start_background_jobs():
+        if started:
+            return
+        with lock:
+            if not started:
+                started.append(True)
+                for starter in starters:
+                    starter(app)
@@ -0,0 +1,92 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor back into a (created_at, id) position"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+def get_limit():
+    """Read the limit query parameter, clamped to the configured maximum"""
+    limit = request.args.get('limit', current_app.config['ITEMS_PER_PAGE'], type=int)
+    return max(1, min(limit, current_app.config['MAX_ITEMS_PER_PAGE']))
+
+def get_page_args():
+    """Read limit and (created_at, id) cursor query parameters"""
+    cursor = request.args.get('cursor')
+    return get_limit(), decode_cursor(cursor) if cursor else None
+
+def get_offset_page_args():
+    """Read limit and offset cursor query parameters, for results ordered by rank rather than time"""
+    cursor = request.args.get('cursor')
+    return get_limit(), decode_offset_cursor(cursor) if cursor else 0
+
+def encode_offset_cursor(offset):
+    """Encode a result offset as an opaque cursor"""
+    return base64.urlsafe_b64encode(f"offset|{offset}".encode()).decode().rstrip('=')
+
+def decode_offset_cursor(cursor):
+    """Decode an offset cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        kind, offset = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if kind != 'offset' or int(offset) < 0:
+            raise ValueError
+        return int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+def paginate_keyset(query, created_col, id_col, limit, cursor=None):
+    """Fetch one page ordered by (created_at, id) descending.
+
+    Returns the rows of the page and the cursor of the next page, or None
+    when this is the last page.
+    """
+    if cursor:
+        query = query.filter(tuple_(created_col, id_col) < tuple_(*cursor))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+
+    return rows, next_cursor
+
+def paginated_response(payload, next_cursor):
+    """JSON response carrying the next cursor in a header"""
+    response = jsonify(payload)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+def stream_ndjson(query, serialize):
+    """Stream query results as newline-delimited JSON.
+
+    Rows are fetched in batches of STREAM_BATCH_SIZE with yield_per, so
+    memory use does not grow with the size of the result set.
+    """
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+
+    def generate():
+        for row in query.yield_per(batch_size):
+            yield json.dumps(serialize(row)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
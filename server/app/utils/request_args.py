@@ -0,0 +1,51 @@
+import uuid
+from datetime import date, datetime, timedelta
+from flask import request
+
+def get_uuid_list_arg(name):
+    """Read a multi-value UUID query parameter (?id=a&id=b or ?id=a,b)"""
+    values = []
+    for raw in request.args.getlist(name):
+        for value in raw.split(','):
+            value = value.strip()
+            if not value:
+                continue
+            try:
+                values.append(uuid.UUID(value))
+            except ValueError:
+                raise ValueError(f'Invalid {name}: {value}')
+    return values
+
+def get_list_arg(name):
+    """Read a multi-value string query parameter (?x=a&x=b or ?x=a,b)"""
+    return [
+        value.strip()
+        for raw in request.args.getlist(name)
+        for value in raw.split(',')
+        if value.strip()
+    ]
+
+def get_datetime_arg(name):
+    """Read an ISO 8601 date or datetime query parameter"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name}: expected an ISO 8601 date')
+
+def get_datetime_end_arg(name):
+    """Read an ISO 8601 upper bound as an exclusive end.
+
+    A date alone covers that whole day, so it ends at the next midnight; a
+    datetime is included itself (timestamps have microsecond resolution).
+    """
+    end = get_datetime_arg(name)
+    if end is None:
+        return None
+    try:
+        date.fromisoformat(request.args[name])
+    except ValueError:
+        return end + timedelta(microseconds=1)
+    return end + timedelta(days=1)
@@ -0,0 +1,96 @@
+import uuid
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql import sqltypes
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import User
+from app.services import analytics
+
+class SQLiteTestingConfig(TestingConfig):
+    """In-memory SQLite, so the tests run without a PostgreSQL server"""
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+def _accept_string_uuids():
+    # psycopg2 binds UUID columns from strings, which handlers pass as they come
+    # from JWT identities; SQLite's Uuid bind processor needs uuid.UUID values
+    bind_processor = sqltypes.Uuid.bind_processor
+
+    def string_bind_processor(self, dialect):
+        process = bind_processor(self, dialect)
+        if process is None:
+            return None
+        return lambda value: process(uuid.UUID(value) if isinstance(value, str) else value)
+
+    sqltypes.Uuid.bind_processor = string_bind_processor
+
+def _strip_postgresql_ddl():
+    """Drop what SQLite cannot create: GIN indexes, generated columns and tsvector types"""
+    for table in db.metadata.tables.values():
+        for index in list(table.indexes):
+            if index.dialect_options['postgresql'].get('using'):
+                table.indexes.discard(index)
+        for column in table.columns:
+            if column.computed is not None:
+                column.computed = None
+                column.server_default = None
+            if type(column.type).__name__ == 'TSVECTOR':
+                column.type = db.Text()
+
+@pytest.fixture(scope='session')
+def app():
+    _accept_string_uuids()
+    app = create_app(SQLiteTestingConfig)
+    with app.app_context():
+        _strip_postgresql_ddl()
+        yield app
+
+@pytest.fixture(autouse=True)
+def database(app, monkeypatch):
+    # Counter upserts use ON CONFLICT, which SQLite spells the same way
+    monkeypatch.setattr(analytics, 'insert', sqlite_insert)
+    db.create_all()
+    yield db
+    db.session.remove()
+    db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_user():
+    def make_user(role, **fields):
+        user = User(email=f'{role}-{uuid.uuid4().hex[:8]}@example.com', first_name=role.title(),
+                    last_name='Test', role=role, **fields)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+@pytest.fixture
+def auth_headers():
+    def auth_headers(user):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    return auth_headers
+
+@pytest.fixture
+def count_statements():
+    """Context manager counting the SQL statements run inside it"""
+    class StatementCounter:
+        def __init__(self):
+            self.count = 0
+
+        def _count(self, *args):
+            self.count += 1
+
+        def __enter__(self):
+            event.listen(db.engine, 'before_cursor_execute', self._count)
+            return self
+
+        def __exit__(self, *exc):
+            event.remove(db.engine, 'before_cursor_execute', self._count)
+
+    return StatementCounter
@@ -0,0 +1,41 @@
+from app import db
+from app.models import Order, OrderItem, Product
+
+def order_request(make_user, lines):
+    """A retailer and an order payload of the given number of lines, each for its own product"""
+    retailer = make_user('retailer')
+    distributor = make_user('distributor')
+    manufacturer = make_user('manufacturer')
+    products = [Product(name=f'Product {i}', sku=f'SKU-{manufacturer.id.hex[:8]}-{i}',
+                        manufacturer_id=manufacturer.id, base_price=10)
+                for i in range(lines)]
+    db.session.add_all(products)
+    db.session.commit()
+
+    payload = {
+        'distributorId': str(distributor.id),
+        'items': [{'productId': str(product.id), 'quantity': 2, 'unitPrice': 10} for product in products]
+    }
+    return retailer, payload
+
+def test_create_order_writes_all_lines(client, auth_headers, make_user):
+    retailer, payload = order_request(make_user, 10)
+    response = client.post('/api/orders/', json=payload, headers=auth_headers(retailer))
+
+    assert response.status_code == 201
+    order = response.get_json()
+    assert len(order['items']) == 10
+    assert float(order['totalAmount']) == 200
+    assert OrderItem.query.filter_by(order_id=Order.query.one().id).count() == 10
+
+def test_create_order_statement_count_does_not_grow_with_lines(client, auth_headers, make_user, count_statements):
+    counts = {}
+    for lines in (10, 100):
+        retailer, payload = order_request(make_user, lines)
+        headers = auth_headers(retailer)
+        with count_statements() as counter:
+            response = client.post('/api/orders/', json=payload, headers=headers)
+        assert response.status_code == 201
+        counts[lines] = counter.count
+
+    assert counts[10] == counts[100]
@@ -0,0 +1,41 @@
+from app import db
+from app.models import Inventory, Product
+
+def stock_distributor(make_user, items):
+    """A distributor stocking the given number of products"""
+    distributor = make_user('distributor')
+    manufacturer = make_user('manufacturer')
+    for i in range(items):
+        product = Product(name=f'Product {i}', sku=f'SKU-{manufacturer.id.hex[:8]}-{i}',
+                          manufacturer_id=manufacturer.id, base_price=i + 1)
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Inventory(distributor_id=distributor.id, product_id=product.id,
+                                 quantity=items - i, selling_price=i + 2, is_available=True))
+    db.session.commit()
+    return distributor
+
+def test_partner_products_sorted_by_price(client, auth_headers, make_user):
+    distributor = stock_distributor(make_user, 5)
+    retailer = make_user('retailer')
+
+    response = client.get(f'/api/products/partner/{distributor.id}?sort=-price',
+                          headers=auth_headers(retailer))
+
+    assert response.status_code == 200
+    assert [product['sellingPrice'] for product in response.get_json()] == [6, 5, 4, 3, 2]
+
+def test_partner_products_statement_count_does_not_grow_with_inventory(client, auth_headers, make_user,
+                                                                       count_statements):
+    counts = {}
+    for items in (10, 100):
+        distributor = stock_distributor(make_user, items)
+        url = f'/api/products/partner/{distributor.id}?limit=100'
+        headers = auth_headers(make_user('retailer'))
+        with count_statements() as counter:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()) == items
+        counts[items] = counter.count
+
+    assert counts[10] == counts[100]
@@ -1,6 +1,10 @@
 from app import create_app
+from app.services.suggest import warm_suggest_index
+from app.utils.jobs import start_when_serving
+from app.services.search_history import schedule_compaction
 
 app = create_app()
+start_when_serving(app, warm_suggest_index, schedule_compaction)
 
 if __name__ == "__main__":
     app.run() 
\ No newline at end of file